@@ -3,8 +3,10 @@ from __future__ import annotations
 import collections
 import functools
 import logging
+import math
 import random
 import secrets
+import threading
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
@@ -78,6 +80,12 @@ class MultiWorld():
     is_race: bool = False
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
+    sphere_index: Optional[SphereIndex]
+    """Spheres of the finished multiworld, shared by everything that needs them during output. None until set."""
+    event_sphere_index: Optional[SphereIndex]
+    """Like sphere_index, but with events in their own spheres instead of collected eagerly. None until set."""
+    profile: Optional[Utils.GenerationProfile]
+    """Wall times of generation sections, world methods and access rules, collected for --profile. None otherwise."""
 
     plando_options: PlandoOptions
     early_items: Dict[int, Dict[str, int]]
@@ -87,6 +95,8 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    item_conditions: Dict[Entrance, Set[str]]
+    item_condition_index: Dict[int, Dict[str, Set[Entrance]]]
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -166,8 +176,13 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.item_conditions = {}
+        self.item_condition_index = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
+        self.sphere_index = None
+        self.event_sphere_index = None
+        self.profile = None
 
         for player in range(1, players + 1):
             def set_player_attr(attr: str, val) -> None:
@@ -513,6 +528,18 @@ class MultiWorld():
         state.can_reach(Region) in the Entrance's traversal condition, as opposed to pure transition logic."""
         self.indirect_connections.setdefault(region, set()).add(entrance)
 
+    def register_item_condition(self, entrance: Entrance, item_names: Iterable[str]):
+        """Report that the traversal condition of this Entrance only depends on these item names of its player,
+        besides Regions reported through register_indirect_condition.
+        CollectionState then only rechecks this Entrance when one of these items gets collected or removed,
+        instead of every time the player's state changes. Item names are matched against both the collected Item's
+        name and the names added to state through CollectionState.add_item, remove_item and set_item."""
+        item_names = tuple(item_names)
+        self.item_conditions.setdefault(entrance, set()).update(item_names)
+        player_index = self.item_condition_index.setdefault(entrance.player, {})
+        for item_name in item_names:
+            player_index.setdefault(item_name, set()).add(entrance)
+
     def get_locations(self, player: Optional[int] = None) -> Iterable[Location]:
         if player is not None:
             return self.regions.location_cache[player].values()
@@ -581,6 +608,12 @@ class MultiWorld():
 
         return False
 
+    def get_sphere_index(self, collect_events_eagerly: bool = True) -> SphereIndex:
+        """Returns the SphereIndex stored in sphere_index or event_sphere_index, depending on collect_events_eagerly,
+        or a new one if none is stored."""
+        sphere_index = self.sphere_index if collect_events_eagerly else self.event_sphere_index
+        return sphere_index if sphere_index else SphereIndex(self, collect_events_eagerly)
+
     def get_spheres(self) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
@@ -589,24 +622,7 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        yield from self.get_sphere_index(collect_events_eagerly=False).iter_spheres()
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -615,46 +631,11 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        yield from self.get_sphere_index().iter_spheres()
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
-        """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
+        """Check if accessibility rules are fulfilled with current or supplied state.
+        Without a supplied state, the spheres from get_sphere_index are used."""
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -682,6 +663,28 @@ class MultiWorld():
                 return False  # still locations required to be collected
             return True
 
+        def report_missing() -> None:
+            if __debug__:
+                from Fill import FillError
+                raise FillError(
+                    f"Could not access required locations for accessibility check. Missing: {locations}",
+                    multiworld=self,
+                )
+            # ran out of places and did not finish yet, quit
+            logging.warning(f"Could not access required locations for accessibility check."
+                            f" Missing: {locations}")
+
+        if not state:
+            sphere_index = self.get_sphere_index()
+            locations = [location for location in self.get_locations() if location_relevant(location)
+                         and not sphere_index.can_reach(location)]
+            beatable_fulfilled = sphere_index.beatable
+            if all_done():
+                return True
+            if locations:
+                report_missing()
+            return False
+
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
         while locations:
@@ -691,15 +694,7 @@ class MultiWorld():
                     sphere.append(locations.pop(n))
 
             if not sphere:
-                if __debug__:
-                    from Fill import FillError
-                    raise FillError(
-                        f"Could not access required locations for accessibility check. Missing: {locations}",
-                        multiworld=self,
-                    )
-                # ran out of places and did not finish yet, quit
-                logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
+                report_missing()
                 return False
 
             for location in sphere:
@@ -715,32 +710,170 @@ class MultiWorld():
         return False
 
 
+class SphereIndex:
+    """
+    Logical spheres of all filled locations of a multiworld, computed in a single pass.
+    Each sphere only requires the items from previous spheres to be reached.
+    Spheres are only computed once they are needed, so iterating just the first spheres does not compute all of them.
+    """
+    _spheres: List[Set[Location]]
+    _sphere_of: Dict[Location, int]
+    _locations: Set[Location]
+    _events: Set[Location]
+    _state: CollectionState
+    _sweep: Optional[Iterator[None]]
+    """computes the next sphere each step, None once all spheres are computed"""
+    _beatable: bool
+    _lock: threading.Lock
+
+    def __init__(self, multiworld: MultiWorld, collect_events_eagerly: bool = True) -> None:
+        """
+        :param multiworld: The multiworld to compute the spheres of.
+        :param collect_events_eagerly: If True, locations that can't be sent by the server (such as events) are
+         collected as soon as they can be reached and share the number of the sphere they got unlocked for, but are
+         not part of spheres. If False, all filled locations are part of spheres.
+        """
+        self._state = CollectionState(multiworld)
+        self._locations = set()
+        self._events = set()
+        for location in multiworld.get_filled_locations():
+            if not collect_events_eagerly or (type(location.item.code) is int and type(location.address) is int):
+                self._locations.add(location)
+            else:
+                self._events.add(location)
+        self._spheres = []
+        self._sphere_of = {}
+        self._sweep = self._sweep_spheres()
+        # output steps run in threads and may share an index
+        self._lock = threading.Lock()
+
+    def _sweep_spheres(self) -> Iterator[None]:
+        state = self._state
+        locations = self._locations
+        events = self._events
+        while True:
+            sphere_number = len(self._spheres)
+
+            # cull events out
+            done_events: Set[Union[Location, None]] = {None}
+            while done_events:
+                done_events = set()
+                for event in events:
+                    if event.can_reach(state):
+                        state.collect(event.item, True, event)
+                        self._sphere_of[event] = sphere_number
+                        done_events.add(event)
+                events -= done_events
+
+            sphere = {location for location in locations if location.can_reach(state)}
+            if not sphere:
+                return
+
+            for location in sphere:
+                state.collect(location.item, True, location)
+                self._sphere_of[location] = sphere_number
+            locations -= sphere
+            self._spheres.append(sphere)
+            yield
+
+    def compute_spheres(self, count: Optional[int] = None) -> None:
+        """Computes spheres until there are more than count of them, or all of them if count is None."""
+        with self._lock:
+            while self._sweep and (count is None or len(self._spheres) <= count):
+                if next(self._sweep, False) is False:
+                    self._sweep = None
+                    self._beatable = self._state.multiworld.has_beaten_game(self._state)
+
+    @property
+    def spheres(self) -> List[Set[Location]]:
+        """reachable locations by sphere, without the eagerly collected events"""
+        self.compute_spheres()
+        return self._spheres
+
+    @property
+    def sphere_of(self) -> Dict[Location, int]:
+        """sphere number of every reachable filled location, including eagerly collected events"""
+        self.compute_spheres()
+        return self._sphere_of
+
+    @property
+    def unreachable(self) -> Set[Location]:
+        """filled locations that could not be reached, without the eagerly collected events"""
+        self.compute_spheres()
+        return self._locations
+
+    @property
+    def unreachable_events(self) -> Set[Location]:
+        """eagerly collected events that could not be reached"""
+        self.compute_spheres()
+        return self._events
+
+    @property
+    def state(self) -> CollectionState:
+        """state after collecting the items of all reachable locations"""
+        self.compute_spheres()
+        return self._state
+
+    @property
+    def beatable(self) -> bool:
+        self.compute_spheres()
+        return self._beatable
+
+    def iter_spheres(self) -> Iterator[Set[Location]]:
+        """
+        yields the set of locations of each sphere, computing them as they are needed
+
+        If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
+        and then a set of all of the unreachable locations.
+        """
+        sphere_number = 0
+        while True:
+            self.compute_spheres(sphere_number)
+            if sphere_number >= len(self._spheres):
+                break
+            yield self._spheres[sphere_number]
+            sphere_number += 1
+        if self._locations:
+            yield set()
+            yield self._locations
+
+    def can_reach(self, location: Location) -> bool:
+        """Whether the location is logically reachable, including unfilled locations."""
+        if location.item:
+            return location in self.sphere_of
+        return location.can_reach(self.state)
+
+
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
 class CollectionState():
-    prog_items: Dict[int, Counter[str]]
+    prog_items: Utils.CopyOnWriteDict[int, Counter[str]]
     multiworld: MultiWorld
-    reachable_regions: Dict[int, Set[Region]]
-    blocked_connections: Dict[int, Set[Entrance]]
+    reachable_regions: Utils.CopyOnWriteDict[int, Set[Region]]
+    blocked_connections: Utils.CopyOnWriteDict[int, Set[Entrance]]
     advancements: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     stale: Dict[int, bool]
+    changed_items: Utils.CopyOnWriteDict[int, Set[str]]
+    changed_connections: Utils.CopyOnWriteDict[int, Set[Entrance]]
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = Utils.CopyOnWriteDict((player, Counter()) for player in parent.get_all_ids())
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
-        self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.reachable_regions = Utils.CopyOnWriteDict((player, set()) for player in parent.get_all_ids())
+        self.blocked_connections = Utils.CopyOnWriteDict((player, set()) for player in parent.get_all_ids())
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
+        self.changed_items = Utils.CopyOnWriteDict((player, set()) for player in parent.get_all_ids())
+        self.changed_connections = Utils.CopyOnWriteDict((player, set()) for player in parent.get_all_ids())
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
             function(self, parent)
@@ -752,7 +885,19 @@ class CollectionState():
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        # both get replaced below, so there is no need to copy them if they are shared
+        changed_items = self.changed_items.peek(player)
+        changed_connections = self.changed_connections.peek(player)
+        if changed_items and player in self.multiworld.item_condition_index:
+            queue = deque(self._get_rechecked_connections(player, changed_items)
+                          | (changed_connections & self.blocked_connections[player]))
+        elif changed_connections and not changed_items:
+            queue = deque(changed_connections & self.blocked_connections[player])
+        else:
+            # nothing known about what changed, fall back to rechecking every blocked connection
+            queue = deque(self.blocked_connections[player])
+        self.changed_items[player] = set()
+        self.changed_connections[player] = set()
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
@@ -766,6 +911,35 @@ class CollectionState():
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
 
+    def invalidate_reachable_regions(self, player: int) -> None:
+        """Makes the next reachability update of player recheck every blocked connection.
+        Needed after changing the region graph itself, which declared item conditions can't account for."""
+        self.stale[player] = True
+        self.changed_items[player] = set()
+        self.changed_connections[player] = set()
+
+    def recheck_connections(self, player: int, connections: Iterable[Entrance]) -> None:
+        """Makes the next reachability update of player check connections again, for example after connecting them
+        to a region. Unlike invalidate_reachable_regions, the other blocked connections are not all rechecked."""
+        if self.stale[player] and not self.changed_items.peek(player) and not self.changed_connections.peek(player):
+            # every blocked connection gets rechecked already
+            return
+        self.changed_connections[player].update(connections)
+        self.stale[player] = True
+
+    def _get_rechecked_connections(self, player: int, changed_items: Set[str]) -> Set[Entrance]:
+        """Blocked connections that could have been unblocked by collecting or removing changed_items."""
+        blocked_connections = self.blocked_connections[player]
+        item_conditions = self.multiworld.item_conditions
+        # connections that did not declare their item conditions could depend on anything
+        rechecked = {connection for connection in blocked_connections if connection not in item_conditions}
+        item_condition_index = self.multiworld.item_condition_index[player]
+        for item_name in changed_items:
+            conditioned = item_condition_index.get(item_name, None)
+            if conditioned:
+                rechecked |= blocked_connections & conditioned
+        return rechecked
+
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
@@ -793,12 +967,16 @@ class CollectionState():
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        item_conditions = self.multiworld.item_conditions
+        # mirrors queue, so connections retried through indirect conditions aren't queued twice without a deque scan
+        queued = set(queue)
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
             new_connection = False
             while queue:
                 connection = queue.popleft()
+                queued.discard(connection)
                 new_region = connection.connected_region
                 if new_region in reachable_regions:
                     blocked_connections.remove(connection)
@@ -810,22 +988,38 @@ class CollectionState():
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
+                    queued.update(new_region.exits)
                     self.path[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
+
+                    # connections with declared item conditions are only retried through their indirect conditions
+                    for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
+                        if new_entrance in blocked_connections and new_entrance in item_conditions \
+                                and new_entrance not in queued:
+                            queue.append(new_entrance)
+                            queued.add(new_entrance)
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
-            queue.extend(blocked_connections)
+            queue.extend(connection for connection in blocked_connections if connection not in item_conditions)
+            queued.update(queue)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        # skips __init__, as collecting the precollected items again would be thrown away right after
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        # per-player structures are shared by both states and only get copied for a player once they are retrieved
+        # from either of them, so players that are not touched afterwards are never copied
+        ret.prog_items = self.prog_items.share()
+        ret.reachable_regions = self.reachable_regions.share()
+        ret.blocked_connections = self.blocked_connections.share()
+        ret.changed_items = self.changed_items.share()
+        ret.changed_connections = self.changed_connections.share()
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
+        ret.stale = self.stale.copy()
         ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -990,52 +1184,55 @@ class CollectionState():
 
     # item name related
     def has(self, item: str, player: int, count: int = 1) -> bool:
-        return self.prog_items[player][item] >= count
+        return self.prog_items.peek(player).get(item, 0) >= count
 
     # for loops are specifically used in all/any/count methods, instead of all()/any()/sum(), to avoid the overhead of
     # creating and iterating generator instances. In `return all(player_prog_items[item] for item in items)`, the
     # argument to all() would be a new generator instance, for example.
+    # Lookups go through the bound dict.get of the player's Counter instead of subscription, as Counter.__missing__ is
+    # a Python level call for every item name that is not in the state, which is the common case in rule evaluation.
+    # The Counter itself is peeked, as reading it does not need a copy if it is still shared with other states.
     def has_all(self, items: Iterable[str], player: int) -> bool:
         """Returns True if each item name of items is in state at least once."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item in items:
-            if not player_prog_items[item]:
+            if not prog_items_get(item, 0):
                 return False
         return True
 
     def has_any(self, items: Iterable[str], player: int) -> bool:
         """Returns True if at least one item name of items is in state at least once."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item in items:
-            if player_prog_items[item]:
+            if prog_items_get(item, 0):
                 return True
         return False
 
     def has_all_counts(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if each item name is in the state at least as many times as specified."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item, count in item_counts.items():
-            if player_prog_items[item] < count:
+            if prog_items_get(item, 0) < count:
                 return False
         return True
 
     def has_any_count(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if at least one item name is in the state at least as many times as specified."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item, count in item_counts.items():
-            if player_prog_items[item] >= count:
+            if prog_items_get(item, 0) >= count:
                 return True
         return False
 
     def count(self, item: str, player: int) -> int:
-        return self.prog_items[player][item]
+        return self.prog_items.peek(player).get(item, 0)
 
     def has_from_list(self, items: Iterable[str], player: int, count: int) -> bool:
         """Returns True if the state contains at least `count` items matching any of the item names from a list."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item_name in items:
-            found += player_prog_items[item_name]
+            found += prog_items_get(item_name, 0)
             if found >= count:
                 return True
         return False
@@ -1044,27 +1241,27 @@ class CollectionState():
         """Returns True if the state contains at least `count` items matching any of the item names from a list.
         Ignores duplicates of the same item."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item_name in items:
-            found += player_prog_items[item_name] > 0
+            found += prog_items_get(item_name, 0) > 0
             if found >= count:
                 return True
         return False
 
     def count_from_list(self, items: Iterable[str], player: int) -> int:
         """Returns the cumulative count of items from a list present in state."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         total = 0
         for item_name in items:
-            total += player_prog_items[item_name]
+            total += prog_items_get(item_name, 0)
         return total
 
     def count_from_list_unique(self, items: Iterable[str], player: int) -> int:
         """Returns the cumulative count of items from a list present in state. Ignores duplicates of the same item."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         total = 0
         for item_name in items:
-            if player_prog_items[item_name] > 0:
+            if prog_items_get(item_name, 0) > 0:
                 total += 1
         return total
 
@@ -1072,9 +1269,9 @@ class CollectionState():
     def has_group(self, item_name_group: str, player: int, count: int = 1) -> bool:
         """Returns True if the state contains at least `count` items present in a specified item group."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
-            found += player_prog_items[item_name]
+            found += prog_items_get(item_name, 0)
             if found >= count:
                 return True
         return False
@@ -1084,27 +1281,27 @@ class CollectionState():
         Ignores duplicates of the same item.
         """
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
-            found += player_prog_items[item_name] > 0
+            found += prog_items_get(item_name, 0) > 0
             if found >= count:
                 return True
         return False
 
     def count_group(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         return sum(
-            player_prog_items[item_name]
+            prog_items_get(item_name, 0)
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
         )
 
     def count_group_unique(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state.
         Ignores duplicates of the same item."""
-        player_prog_items = self.prog_items[player]
+        prog_items_get = self.prog_items.peek(player).get
         return sum(
-            player_prog_items[item_name] > 0
+            prog_items_get(item_name, 0) > 0
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
         )
 
@@ -1116,6 +1313,7 @@ class CollectionState():
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
+        self.changed_items[item.player].add(item.name)
 
         if changed and not prevent_sweep:
             self.sweep_for_advancements()
@@ -1132,6 +1330,7 @@ class CollectionState():
         """
         assert count > 0
         self.prog_items[player][item] += count
+        self.changed_items[player].add(item)
 
     def remove(self, item: Item):
         changed = self.multiworld.worlds[item.player].remove(self, item)
@@ -1139,6 +1338,8 @@ class CollectionState():
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.changed_items[item.player] = set()
+            self.changed_connections[item.player] = set()
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1151,6 +1352,7 @@ class CollectionState():
         """
         assert count > 0
         self.prog_items[player][item] -= count
+        self.changed_items[player].add(item)
         if self.prog_items[player][item] < 1:
             del (self.prog_items[player][item])
 
@@ -1163,6 +1365,7 @@ class CollectionState():
         :param count: How many of the item to now have.
         """
         assert count >= 0
+        self.changed_items[player].add(item)
         if count == 0:
             del (self.prog_items[player][item])
         else:
@@ -1333,7 +1536,7 @@ class Region:
     def can_reach(self, state: CollectionState) -> bool:
         if state.stale[self.player]:
             state.update_reachable_regions(self.player)
-        return self in state.reachable_regions[self.player]
+        return self in state.reachable_regions.peek(self.player)
 
     @property
     def hint_text(self) -> str:
@@ -1695,51 +1898,55 @@ class Spoiler:
         # get locations containing progress items
         multiworld = self.multiworld
         prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
-        state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
 
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        # Events get their own spheres here instead of being collected eagerly, as the culling below restarts from
+        # the state before each sphere and gets a lot slower with fewer, larger spheres.
+        sphere_index = multiworld.get_sphere_index(collect_events_eagerly=False)
+        spheres_by_number: Dict[int, Set[Location]] = defaultdict(set)
+        sphere_candidates: Set[Location] = set()
+        for location in prog_locations:
+            sphere_number = sphere_index.sphere_of.get(location, None)
+            if sphere_number is None:
+                sphere_candidates.add(location)
+            else:
+                spheres_by_number[sphere_number].add(location)
 
-            sphere_candidates -= sphere
+        for sphere_number in sorted(spheres_by_number):
+            sphere = spheres_by_number[sphere_number]
             collection_spheres.append(sphere)
-            state_cache.append(state.copy())
 
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
                           len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if not multiworld.has_beaten_game(state):
-                    raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
-                                       "Something went terribly wrong here. "
-                                       f"Unreachable progression items: {sphere_candidates}")
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+
+        if sphere_candidates:
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if not sphere_index.beatable:
+                raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
+                                   "Something went terribly wrong here. "
+                                   f"Unreachable progression items: {sphere_candidates}")
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         required_locations = {location for sphere in collection_spheres for location in sphere}
+        state_cache = self._SphereStateCache(multiworld, collection_spheres)
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
             to_delete: Set[Location] = set()
+            state_before = state_cache.get(num)
             for location in sphere:
                 # we remove the location from required_locations to sweep from, and check if the game is still beatable
                 logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
                               location.item.player)
                 required_locations.remove(location)
-                if multiworld.can_beat_game(state_cache[num], required_locations):
+                if multiworld.can_beat_game(state_before, required_locations):
                     to_delete.add(location)
                 else:
                     # still required, got to keep it around
@@ -1805,6 +2012,44 @@ class Spoiler:
         for item in removed_precollected:
             multiworld.push_precollected(item)
 
+    class _SphereStateCache:
+        """
+        Provides the state before each of the collection spheres, for culling them from the last one to the first.
+        Only every n-th state is kept, with n the square root of the sphere count, and the states in between are
+        collected again from those when needed, instead of keeping a copy of the state for every sphere.
+        Relies on spheres before the one requested not having changed since the cache was created.
+        """
+        def __init__(self, multiworld: MultiWorld, spheres: List[Set[Location]]) -> None:
+            self.multiworld = multiworld
+            self.spheres = spheres
+            self.interval = max(1, math.isqrt(len(spheres)))
+            self.checkpoints: Dict[int, CollectionState] = {}
+            self.block: Dict[int, CollectionState] = {}
+            state = CollectionState(multiworld)
+            for num, sphere in enumerate(spheres):
+                if num and num % self.interval == 0:
+                    self.checkpoints[num] = state.copy()
+                self.collect(state, sphere)
+
+        @staticmethod
+        def collect(state: CollectionState, sphere: Set[Location]) -> None:
+            for location in sphere:
+                state.collect(location.item, True, location)
+
+        def get(self, num: int) -> Optional[CollectionState]:
+            """Returns the state before sphere num, None for the first sphere."""
+            if not num:
+                return None
+            if num not in self.block:
+                start = num - num % self.interval
+                state = self.checkpoints[start].copy() if start else CollectionState(self.multiworld)
+                self.block = {start: state}
+                for block_num in range(start, num):
+                    state = state.copy()
+                    self.collect(state, self.spheres[block_num])
+                    self.block[block_num + 1] = state
+            return self.block[num]
+
     def create_paths(self, state: CollectionState, collection_spheres: List[Set[Location]]) -> None:
         from itertools import zip_longest
         multiworld = self.multiworld
@@ -1822,11 +2067,20 @@ class Spoiler:
             pathpairs = zip_longest(pathsiter, pathsiter)
             return list(pathpairs)
 
+        # locations in the same region share their path
+        region_paths: Dict[Region, List[Union[Tuple[str, str], Tuple[str, None]]]] = {}
+
+        def get_region_path(region: Region) -> List[Union[Tuple[str, str], Tuple[str, None]]]:
+            path = region_paths.get(region, None)
+            if path is None:
+                path = region_paths[region] = get_path(state, region)
+            return path
+
         self.paths = {}
         topology_worlds = (player for player in multiworld.player_ids if multiworld.worlds[player].topology_present)
         for player in topology_worlds:
             self.paths.update(
-                {str(location): get_path(state, location.parent_region)
+                {str(location): get_region_path(location.parent_region)
                  for sphere in collection_spheres for location in sphere
                  if location.player == player})
             if player in multiworld.get_game_players("A Link to the Past"):
@@ -1852,6 +2106,13 @@ class Spoiler:
                 display_name = getattr(option_obj, "display_name", option_key)
                 outfile.write(f"{display_name + ':':33}{res.current_option_name}\n")
 
+        def write_lines(lines: Iterable[str]) -> None:
+            """Writes lines separated by line breaks, without joining them all in memory first."""
+            for line_number, line in enumerate(lines):
+                if line_number:
+                    outfile.write("\n")
+                outfile.write(line)
+
         with open(filename, 'w', encoding="utf-8-sig") as outfile:
             outfile.write(
                 'Archipelago Version %s  -  Seed: %s\n\n' % (
@@ -1879,11 +2140,11 @@ class Spoiler:
 
             if self.entrances:
                 outfile.write('\n\nEntrances:\n\n')
-                outfile.write('\n'.join(['%s%s %s %s' % (f'{self.multiworld.get_player_name(entry["player"])}: '
-                                                         if self.multiworld.players > 1 else '', entry['entrance'],
-                                                         '<=>' if entry['direction'] == 'both' else
-                                                         '<=' if entry['direction'] == 'exit' else '=>',
-                                                         entry['exit']) for entry in self.entrances.values()]))
+                write_lines('%s%s %s %s' % (f'{self.multiworld.get_player_name(entry["player"])}: '
+                                            if self.multiworld.players > 1 else '', entry['entrance'],
+                                            '<=>' if entry['direction'] == 'both' else
+                                            '<=' if entry['direction'] == 'exit' else '=>',
+                                            entry['exit']) for entry in self.entrances.values())
 
             AutoWorld.call_all(self.multiworld, "write_spoiler", outfile)
 
@@ -1895,37 +2156,80 @@ class Spoiler:
                 outfile.write("\n\nStarting Items:\n\n")
                 outfile.write("\n".join([item for item in precollected_items]))
 
-            locations = [(str(location), str(location.item) if location.item is not None else "Nothing")
-                         for location in self.multiworld.get_locations() if location.show_in_spoiler]
             outfile.write('\n\nLocations:\n\n')
-            outfile.write('\n'.join(
-                ['%s: %s' % (location, item) for location, item in locations]))
+            write_lines('%s: %s' % (location, location.item if location.item is not None else "Nothing")
+                        for location in self.multiworld.get_locations() if location.show_in_spoiler)
 
             outfile.write('\n\nPlaythrough:\n\n')
-            outfile.write('\n'.join(['%s: {\n%s\n}' % (sphere_nr, '\n'.join(
+            write_lines('%s: {\n%s\n}' % (sphere_nr, '\n'.join(
                 [f"  {location}: {item}" for (location, item) in sphere.items()] if isinstance(sphere, dict) else
-                [f"  {item}" for item in sphere])) for (sphere_nr, sphere) in self.playthrough.items()]))
+                [f"  {item}" for item in sphere])) for (sphere_nr, sphere) in self.playthrough.items())
             if self.unreachables:
                 outfile.write('\n\nUnreachable Progression Items:\n\n')
-                outfile.write(
-                    '\n'.join(['%s: %s' % (unreachable.item, unreachable)
-                               for unreachable in sorted(self.unreachables)]))
+                write_lines('%s: %s' % (unreachable.item, unreachable) for unreachable in sorted(self.unreachables))
 
             if self.paths:
                 outfile.write('\n\nPaths:\n\n')
-                path_listings: List[str] = []
-                for location, path in sorted(self.paths.items()):
+
+                def path_listing(location: str, path: List[Union[Tuple[str, str], Tuple[str, None]]]) -> str:
                     path_lines: List[str] = []
                     for region, exit in path:
                         if exit is not None:
                             path_lines.append("{} -> {}".format(region, exit))
                         else:
                             path_lines.append(region)
-                    path_listings.append("{}\n        {}".format(location, "\n   =>   ".join(path_lines)))
+                    return "{}\n        {}".format(location, "\n   =>   ".join(path_lines))
 
-                outfile.write('\n'.join(path_listings))
+                write_lines(path_listing(location, path) for location, path in sorted(self.paths.items()))
             AutoWorld.call_all(self.multiworld, "write_spoiler_end", outfile)
 
+    def to_json_file(self, filename: str) -> None:
+        """
+        Writes the spoiler as compact JSON, for tools rather than people. Locations are [location, location player,
+        item, item player] rows and world specific spoiler text is left out.
+        """
+        import json
+        from itertools import chain
+        from Options import Visibility
+        multiworld = self.multiworld
+
+        def dump(value: Any) -> str:
+            return json.dumps(value, separators=(",", ":"))
+
+        def location_row(location: Location) -> List[Union[str, int, None]]:
+            item = location.item
+            return [location.name, location.player, item.name if item else None, item.player if item else None]
+
+        def player_info(player: int) -> Dict[str, Any]:
+            options = multiworld.worlds[player].options
+            return {
+                "name": multiworld.get_player_name(player),
+                "game": multiworld.game[player],
+                "options": {option_key: getattr(options, option_key).current_option_name
+                            for option_key in multiworld.worlds[player].options_dataclass.type_hints
+                            if getattr(options, option_key).visibility & Visibility.spoiler},
+            }
+
+        with open(filename, "w", encoding="utf-8") as outfile:
+            outfile.write(f'{{"version":{dump(Utils.__version__)},"seed":{dump(multiworld.seed)},'
+                          f'"seed_name":{dump(multiworld.seed_name)},"algorithm":{dump(multiworld.algorithm)},'
+                          f'"players":{{')
+            outfile.write(",".join(f"{dump(str(player))}:{dump(player_info(player))}"
+                                   for player in multiworld.player_ids))
+            outfile.write(f'}},"entrances":{dump(list(self.entrances.values()))},"starting_items":')
+            outfile.write(dump([[item.name, item.player]
+                                for item in chain.from_iterable(multiworld.precollected_items.values())]))
+            # written one location at a time, as this is by far the largest part
+            outfile.write(',"locations":[')
+            for number, location in enumerate(location for location in multiworld.get_locations()
+                                              if location.show_in_spoiler):
+                if number:
+                    outfile.write(",")
+                outfile.write(dump(location_row(location)))
+            outfile.write(f'],"playthrough":{dump(self.playthrough)},"unreachables":'
+                          f'{dump([location_row(location) for location in sorted(self.unreachables)])},'
+                          f'"paths":{dump(self.paths)}}}')
+
 
 class Tutorial(NamedTuple):
     """Class to build website tutorial pages from a .md file in the world's /docs folder. Order is as follows.
@@ -1,6 +1,10 @@
+import bisect
 import collections
+import functools
+import heapq
 import itertools
 import logging
+import time
 import typing
 from collections import Counter, deque
 
@@ -24,6 +28,133 @@ def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
     logging.info(f"Current fill step ({name}) at {placed}/{total_items} items placed.")
 
 
+def _fill_signature(location: Location) -> typing.Hashable:
+    """
+    Locations with the same signature accept the same items, the location itself if that can't be told.
+    locality_rules shares one item_rule per player and original rule, so most locations share their signature.
+    """
+    if type(location).can_fill is not Location.can_fill:
+        return location
+    item_rule = location.item_rule
+    always_allow = location.always_allow
+    if getattr(item_rule, "__self__", None) is location or getattr(always_allow, "__self__", None) is location:
+        return location
+    return type(location), location.player, location.progress_type, item_rule, always_allow
+
+
+class PlacementIndex:
+    """
+    Finds the first of a list of locations that accepts an item, like checking them in order would,
+    but groups locations by their _fill_signature and asks once per group whether it accepts the item at all.
+    """
+    locations: typing.List[Location]
+    """the locations searched, in their order, gets mutated by removing taken locations"""
+    groups: typing.List[typing.List[Location]]
+    starts: typing.List[int]
+    """index of the first location not taken yet in each group"""
+    heads: typing.List[typing.Tuple[int, int]]
+    """position of the first location not taken yet and index of each group that has one, sorted"""
+    taken_before: typing.List[int]
+    """Fenwick tree counting taken locations by position, to find where a location now is in locations"""
+
+    def __init__(self, locations: typing.List[Location]) -> None:
+        self.locations = locations
+        self.order = {location: position for position, location in enumerate(locations)}
+        groups: typing.Dict[typing.Hashable, typing.List[Location]] = {}
+        for location in locations:
+            groups.setdefault(_fill_signature(location), []).append(location)
+        self.groups = list(groups.values())
+        self.starts = [0] * len(self.groups)
+        self.group_of = {location: number for number, group in enumerate(self.groups) for location in group}
+        self.heads = sorted((self.order[group[0]], number) for number, group in enumerate(self.groups))
+        self.taken: typing.Set[Location] = set()
+        self.taken_before = [0] * (len(locations) + 1)
+
+    def find(self, accepts: typing.Callable[[Location], bool],
+             group_accepts: typing.Optional[typing.Callable[[Location], bool]] = None) -> typing.Optional[Location]:
+        """
+        Returns the first location for which accepts is true.
+        :param accepts: check whether a location takes the item,
+            has to give the same answer for a whole group unless group_accepts is given.
+        :param group_accepts: check that gives the same answer for a whole group, and is true wherever accepts is.
+        """
+        groups = self.groups
+        starts = self.starts
+        if group_accepts is None:
+            for _, number in self.heads:
+                location = groups[number][starts[number]]
+                if accepts(location):
+                    return location
+            return None
+
+        # next locations of groups that passed group_accepts, but whose earlier locations didn't pass accepts
+        pending: typing.List[typing.Tuple[int, int, int]] = []
+        for position, number in self.heads:
+            while pending and pending[0][0] < position:
+                location = self._check_pending(pending, accepts)
+                if location:
+                    return location
+            group = groups[number]
+            index = starts[number]
+            location = group[index]
+            if index + 1 < len(group):
+                if not group_accepts(location):
+                    continue
+                if accepts(location):
+                    return location
+                self._push_pending(pending, number, index + 1)
+            elif accepts(location):
+                return location
+        while pending:
+            location = self._check_pending(pending, accepts)
+            if location:
+                return location
+        return None
+
+    def _push_pending(self, pending: typing.List[typing.Tuple[int, int, int]], number: int, index: int) -> None:
+        group = self.groups[number]
+        while index < len(group) and group[index] in self.taken:
+            index += 1
+        if index < len(group):
+            heapq.heappush(pending, (self.order[group[index]], number, index))
+
+    def _check_pending(self, pending: typing.List[typing.Tuple[int, int, int]],
+                       accepts: typing.Callable[[Location], bool]) -> typing.Optional[Location]:
+        _, number, index = heapq.heappop(pending)
+        location = self.groups[number][index]
+        if accepts(location):
+            return location
+        self._push_pending(pending, number, index + 1)
+        return None
+
+    def take(self, location: Location) -> None:
+        """Removes a location returned by find."""
+        position = self.order[location]
+        # count the locations taken before this one, so it can be popped by index instead of searched for
+        index = position
+        tree_index = position
+        while tree_index > 0:
+            index -= self.taken_before[tree_index]
+            tree_index &= tree_index - 1
+        tree_index = position + 1
+        while tree_index < len(self.taken_before):
+            self.taken_before[tree_index] += 1
+            tree_index += tree_index & -tree_index
+        del self.locations[index]
+        self.taken.add(location)
+
+        number = self.group_of[location]
+        group = self.groups[number]
+        start = self.starts[number]
+        if group[start] is location:
+            del self.heads[bisect.bisect_left(self.heads, (position, number))]
+            while start < len(group) and group[start] in self.taken:
+                start += 1
+            self.starts[number] = start
+            if start < len(group):
+                bisect.insort(self.heads, (self.order[group[start]], number))
+
+
 def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
                     locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
     new_state = base_state.copy()
@@ -33,6 +164,59 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class PoolSweepCheckpoints:
+    """
+    Sweeps from a base state with the items of a pool collected, like sweep_from_pool, while the pool gets smaller.
+    Keeps states swept with the first half, three quarters and so on of the pool collected. As fill_restrictive takes
+    items mostly from the end of the pool, those usually stay valid and each sweep only collects the rest of the pool
+    and explores what that unlocks, instead of starting over from the base state.
+    A checkpoint stays valid while none of its items were taken from the pool and no item was taken from a location.
+    """
+    min_checkpoint_items = 16
+    """fewer items than this left to collect after the last checkpoint are collected each time"""
+
+    def __init__(self, base_state: CollectionState, item_pool: typing.Union[typing.List[Item], typing.List[Location]],
+                 from_locations: bool = False) -> None:
+        """:param from_locations: item_pool is a list of locations, whose items get collected from them"""
+        self.base_state = base_state
+        self.item_pool = item_pool
+        self.from_locations = from_locations
+        self.checkpoints: typing.List[typing.Tuple[int, CollectionState]] = []
+        """number of items of item_pool collected and the swept state, for each checkpoint"""
+
+    def removed(self, index: int) -> None:
+        """To be called when the item at index is removed from item_pool."""
+        while self.checkpoints and self.checkpoints[-1][0] > index:
+            self.checkpoints.pop()
+
+    def clear(self) -> None:
+        """To be called when an item was removed from a location."""
+        self.checkpoints.clear()
+
+    def sweep(self, extra_items: typing.Union[typing.Sequence[Item], typing.Sequence[Location]] = (),
+              locations: typing.Optional[typing.Iterable[Location]] = None) -> CollectionState:
+        """Returns a new state swept from base_state with item_pool and extra_items collected."""
+        collected, state = self.checkpoints[-1] if self.checkpoints else (0, self.base_state)
+        while len(self.item_pool) - collected >= 2 * self.min_checkpoint_items:
+            checkpoint = collected + (len(self.item_pool) - collected) // 2
+            # everything reachable with fewer items stays reachable with more, so sweeping on from here gives
+            # the same result as sweeping from base_state
+            state = self._sweep(state, self.item_pool[collected:checkpoint], locations)
+            collected = checkpoint
+            self.checkpoints.append((collected, state))
+        return self._sweep(state, [*self.item_pool[collected:], *extra_items], locations)
+
+    def _sweep(self, state: CollectionState, pool: typing.Union[typing.Sequence[Item], typing.Sequence[Location]],
+               locations: typing.Optional[typing.Iterable[Location]]) -> CollectionState:
+        if not self.from_locations:
+            return sweep_from_pool(state, pool, locations)
+        new_state = state.copy()
+        for location in pool:
+            new_state.collect(location.item, True, location)
+        new_state.sweep_for_advancements(locations=locations)
+        return new_state
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -51,6 +235,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     :param allow_excluded: if true and placement fails, it is re-attempted while ignoring excluded on Locations
     :param name: name of this fill step for progress logging purposes
     """
+    start = time.perf_counter()
     unplaced_items: typing.List[Item] = []
     placements: typing.List[Location] = []
     cleanup_required = False
@@ -59,6 +244,10 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
 
+    placement_index = PlacementIndex(locations)
+
+    pool_sweeps = PoolSweepCheckpoints(base_state, item_pool)
+
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
@@ -80,11 +269,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             for p, pool_item in enumerate(reversed(item_pool), start=1):
                 if pool_item is item:
                     del item_pool[-p]
+                    pool_sweeps.removed(len(item_pool) + 1 - p)
                     break
 
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        maximum_exploration_state = pool_sweeps.sweep(
+            unplaced_items, multiworld.get_filled_locations(item.player) if single_player_placement else None)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
@@ -105,14 +294,14 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
+            def can_fill(location: Location, check_access: bool = perform_access_check) -> bool:
+                return (not single_player_placement or location.player == item_to_place.player) \
+                    and location.can_fill(maximum_exploration_state, item_to_place, check_access)
 
+            spot_to_fill = placement_index.find(
+                can_fill, functools.partial(can_fill, check_access=False) if perform_access_check else None)
+            if spot_to_fill:
+                placement_index.take(spot_to_fill)
             else:
                 # we filled all reachable spots.
                 if swap:
@@ -173,6 +362,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             # Add this item to the existing placement, and
                             # add the old item to the back of the queue
                             spot_to_fill = placements.pop(i)
+                            pool_sweeps.clear()
 
                             swap_count += 1
                             swapped_items[placed_item.player, placed_item.name, unsafe] = swap_count
@@ -252,6 +442,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             f"{', '.join(str(place) for place in placements)}", multiworld=multiworld)
 
     item_pool.extend(unplaced_items)
+    if multiworld.profile:
+        multiworld.profile.add_section(f"fill_restrictive ({name})", time.perf_counter() - start)
 
 
 def remaining_fill(multiworld: MultiWorld,
@@ -276,17 +468,12 @@ def remaining_fill(multiworld: MultiWorld,
         def location_can_fill_item(location_to_fill: Location, item_to_fill: Item):
             return location_to_fill.item_rule(item_to_fill)
 
+    placement_index = PlacementIndex(locations)
     while locations and itempool:
         item_to_place = itempool.pop()
-        spot_to_fill: typing.Optional[Location] = None
-
-        for i, location in enumerate(locations):
-            if location_can_fill_item(location, item_to_place):
-                # popping by index is faster than removing by content,
-                spot_to_fill = locations.pop(i)
-                # skipping a scan for the element
-                break
-
+        spot_to_fill = placement_index.find(functools.partial(location_can_fill_item, item_to_fill=item_to_place))
+        if spot_to_fill:
+            placement_index.take(spot_to_fill)
         else:
             # we filled all reachable spots.
             # try swapping this item with previously placed items
@@ -745,6 +932,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     if not balanceable_players:
         logging.info("Skipping multiworld progression balancing.")
     else:
+        start = time.perf_counter()
         logging.info(f"Balancing multiworld progression for {len(balanceable_players)} Players.")
         logging.debug(balanceable_players)
         state: CollectionState = CollectionState(multiworld)
@@ -768,6 +956,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
+        # spheres after sphere_locations, already found while looking for candidates and valid until items move
+        upcoming_spheres: typing.Deque[typing.Set[Location]] = deque()
 
         def get_sphere_locations(sphere_state: CollectionState,
                                  locations: typing.Set[Location]) -> typing.Set[Location]:
@@ -784,7 +974,10 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            if upcoming_spheres:
+                sphere_locations = upcoming_spheres.popleft()
+            else:
+                sphere_locations = get_sphere_locations(state, unchecked_locations)
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
@@ -819,6 +1012,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                     balancing_reachables = reachable_locations_count.copy()
                     balancing_sphere = sphere_locations.copy()
                     candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
+                    balancing_sphere_num = 0
                     while True:
                         # Check locations in the current sphere and gather progression items to swap earlier
                         for location in balancing_sphere:
@@ -832,7 +1026,13 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        # balancing_state collects the same spheres as state will, unless items get moved
+                        if balancing_sphere_num < len(upcoming_spheres):
+                            balancing_sphere = upcoming_spheres[balancing_sphere_num]
+                        else:
+                            balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                            upcoming_spheres.append(balancing_sphere)
+                        balancing_sphere_num += 1
                         for location in balancing_sphere:
                             balancing_unchecked_locations.remove(location)
                             if not location.locked:
@@ -855,16 +1055,13 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
+                        # the candidates are tested from the end, so states with the first ones collected are reused
+                        test_sweeps = PoolSweepCheckpoints(state, items_to_test, from_locations=True)
                         while items_to_test:
                             testing = items_to_test.pop()
-                            reducing_state = state.copy()
-                            for location in itertools.chain((
-                                    l for l in items_to_replace
-                                    if l.item.player == player
-                            ), items_to_test):
-                                reducing_state.collect(location.item, True, location)
-
-                            reducing_state.sweep_for_advancements(locations=locations_to_test)
+                            test_sweeps.removed(len(items_to_test))
+                            reducing_state = test_sweeps.sweep([l for l in items_to_replace if l.item.player == player],
+                                                               locations_to_test)
 
                             if multiworld.has_beaten_game(balancing_state):
                                 if not multiworld.has_beaten_game(reducing_state):
@@ -901,6 +1098,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                             logging.warning(f"Could not Progression Balance {old_location.item}")
 
                     if old_moved_item_count < moved_item_count:
+                        upcoming_spheres.clear()
                         logging.debug(f"Moved {moved_item_count} items so far\n")
                         unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
                         for location in get_sphere_locations(state, unlocked):
@@ -920,6 +1118,9 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 logging.warning("Progression Balancing ran out of paths.")
                 break
 
+        logging.info(f"Progression balancing moved {moved_item_count} items over {sphere_num - 1} spheres "
+                     f"in {time.perf_counter() - start:.2f} seconds.")
+
 
 def swap_location_item(location_1: Location, location_2: Location, check_locked: bool = True) -> None:
     """Swaps Items of locations. Does NOT swap flags like shop_slot or locked, but does swap event"""
@@ -38,6 +38,8 @@ def mystery_argparse(argv: list[str] | None = None):
     parser.add_argument('--seed', help='Define seed number to generate.', type=int)
     parser.add_argument('--multi', default=defaults.players, type=lambda value: max(int(value), 1))
     parser.add_argument('--spoiler', type=int, default=defaults.spoiler)
+    parser.add_argument('--spoiler_json', action='store_true',
+                        help="Also write the spoiler as compact JSON, for use by other tools.")
     parser.add_argument('--outputpath', default=settings.general_options.output_path,
                         help="Path to output folder. Absolute or relative to cwd.")  # absolute or relative to cwd
     parser.add_argument('--race', action='store_true', default=defaults.race)
@@ -57,6 +59,9 @@ def mystery_argparse(argv: list[str] | None = None):
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--profile", nargs="?", type=int, const=25, default=0, metavar="TOP_RULES",
+                        help="Writes a JSON report of the time taken by each generation step and world, "
+                             "as well as the access rules taking the most time, 25 unless specified.")
     args = parser.parse_args(argv)
 
     if args.skip_output and args.spoiler_only:
@@ -1,21 +1,23 @@
 import collections
 from collections.abc import Mapping
 import concurrent.futures
+import contextlib
+import itertools
+import json
 import logging
 import os
 import tempfile
 import time
-from typing import Any
+from typing import Any, Callable, Iterator
 import zipfile
-import zlib
 
 import worlds
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, SphereIndex
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
-from NetUtils import convert_to_base_types
+from NetUtils import convert_to_base_types, dump_sectioned_multidata
 from Options import StartInventoryPool
-from Utils import __version__, output_path, restricted_dumps, version_tuple
+from Utils import GenerationProfile, ZlibWriter, __version__, output_path, restricted_dump, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -34,6 +36,8 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     start = time.perf_counter()
     # initialize the multiworld
     multiworld = MultiWorld(args.multi)
+    if args.profile:
+        multiworld.profile = GenerationProfile()
 
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
@@ -73,7 +77,12 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if not args.skip_output and not args.spoiler_only:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
-    AutoWorld.call_all(multiworld, "generate_early")
+    # optionally run the per-world steps leading up to fill for worlds that allow it at the same time
+    world_stage_threads = get_settings().generator.world_stage_threads
+    stage_executor = concurrent.futures.ThreadPoolExecutor(world_stage_threads, "World Stage") \
+        if world_stage_threads > 1 and multiworld.players > 1 else None
+
+    AutoWorld.call_all(multiworld, "generate_early", executor=stage_executor)
 
     logger.info('')
 
@@ -109,13 +118,13 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld.worlds[1].options.local_items.value = set()
 
     logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
+    AutoWorld.call_all(multiworld, "create_regions", executor=stage_executor)
 
     logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+    AutoWorld.call_all(multiworld, "create_items", executor=stage_executor)
 
     logger.info('Calculating Access Rules.')
-    AutoWorld.call_all(multiworld, "set_rules")
+    AutoWorld.call_all(multiworld, "set_rules", executor=stage_executor)
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -141,8 +150,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     multiworld.plando_item_blocks = parse_planned_blocks(multiworld)
 
-    AutoWorld.call_all(multiworld, "connect_entrances")
-    AutoWorld.call_all(multiworld, "generate_basic")
+    AutoWorld.call_all(multiworld, "connect_entrances", executor=stage_executor)
+    AutoWorld.call_all(multiworld, "generate_basic", executor=stage_executor)
+    if stage_executor:
+        stage_executor.shutdown()
 
     # remove starting inventory from pool items.
     # Because some worlds don't actually create items during create_items this has to be as late as possible.
@@ -184,6 +195,9 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if any(world.options.item_links for world in multiworld.worlds.values()):
         multiworld._all_state = None
 
+    if multiworld.profile:
+        multiworld.profile.time_rules(itertools.chain(multiworld.get_locations(), multiworld.get_entrances()))
+
     logger.info("Running Item Plando.")
     resolve_early_locations_for_planned(multiworld)
     distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
@@ -195,15 +209,17 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+    with _profile_section(multiworld, "fill"):
+        if multiworld.algorithm == 'flood':
+            flood_items(multiworld)  # different algo, biased towards early game progress items
+        elif multiworld.algorithm == 'balanced':
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        with _profile_section(multiworld, "progression_balancing"):
+            balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -212,6 +228,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     if args.skip_output:
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
+        _write_profile(multiworld, args.profile, time.perf_counter() - start)
         return multiworld
 
     logger.info(f'Beginning output...')
@@ -220,18 +237,33 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if args.spoiler_only:
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with _profile_section(multiworld, "playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
-        multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+        with _profile_section(multiworld, "spoiler"):
+            multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
+            if args.spoiler_json:
+                multiworld.spoiler.to_json_file(output_path('%s_Spoiler.json' % outfilebase))
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
+        _write_profile(multiworld, args.profile, time.perf_counter() - start)
         return multiworld
 
+    # items don't move anymore, so the spheres are calculated once for the accessibility check,
+    # the multidata and the playthrough
+    logger.info('Calculating spheres.')
+    with _profile_section(multiworld, "spheres"):
+        multiworld.sphere_index = SphereIndex(multiworld)
+        multiworld.sphere_index.compute_spheres()
+        # only computed once the playthrough or a world asks for spheres including events
+        multiworld.event_sphere_index = SphereIndex(multiworld, collect_events_eagerly=False)
+
     output = tempfile.TemporaryDirectory()
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
+        with _output_executor(len(output_players) + 2) as pool, _profile_section(multiworld, "output"):
+            check_accessibility_task = pool.submit(
+                _profiled(multiworld, "accessibility_check", multiworld.fulfills_accessibility))
 
             output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
             for player in output_players:
@@ -350,13 +382,17 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
-
+                compression_level = get_settings().generator.multidata_compression_level
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(serialized_multidata)
+                    # pickled and compressed in chunks, so the whole multidata is never in memory uncompressed
+                    if get_settings().generator.sectioned_multidata:
+                        dump_sectioned_multidata(multidata, f, compression_level)
+                    else:
+                        f.write(bytes([3]))  # version of format
+                        with ZlibWriter(f, compression_level) as compressed:
+                            restricted_dump(multidata, compressed)
 
-            output_file_futures.append(pool.submit(write_multidata))
+            output_file_futures.append(pool.submit(_profiled(multiworld, "write_multidata", write_multidata)))
             if not check_accessibility_task.result():
                 if not multiworld.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
@@ -371,17 +407,56 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with _profile_section(multiworld, "playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            with _profile_section(multiworld, "spoiler"):
+                multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+                if args.spoiler_json:
+                    multiworld.spoiler.to_json_file(os.path.join(temp_dir, '%s_Spoiler.json' % outfilebase))
 
         zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
         with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
+                             compresslevel=9) as zf, _profile_section(multiworld, "archive"):
             for file in os.scandir(temp_dir):
                 zf.write(file.path, arcname=file.name)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
+    _write_profile(multiworld, args.profile, time.perf_counter() - start)
     return multiworld
+
+
+@contextlib.contextmanager
+def _output_executor(max_workers: int) -> Iterator[concurrent.futures.ThreadPoolExecutor]:
+    """A thread pool that is not waited for if generation fails or gets interrupted, such as by a timeout."""
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers)
+    try:
+        yield pool
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+
+def _profile_section(multiworld: MultiWorld, name: str) -> contextlib.AbstractContextManager[None]:
+    return multiworld.profile.section(name) if multiworld.profile else contextlib.nullcontext()
+
+
+def _profiled(multiworld: MultiWorld, name: str, function: Callable[[], Any]) -> Callable[[], Any]:
+    return multiworld.profile.timed(name, function) if multiworld.profile else function
+
+
+def _write_profile(multiworld: MultiWorld, top_rules: int, seconds: float) -> None:
+    if multiworld.profile:
+        report = {
+            "seed": multiworld.seed_name,
+            "players": multiworld.players,
+            "seconds": seconds,
+            **multiworld.profile.to_dict(multiworld.player_name, multiworld.game, top_rules),
+        }
+        profile_path = output_path(f"AP_{multiworld.seed_name}_profile.json")
+        with open(profile_path, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Wrote generation profile to {profile_path}")
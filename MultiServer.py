@@ -43,7 +43,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, MultiData, Hint, HintStatus
+    SlotType, LocationStore, MultiData, Hint, HintStatus, SectionedMultiData, GamesPackage
 from BaseClasses import ItemClassification
 
 
@@ -106,6 +106,45 @@ def queue_gc():
         gc_thread.start()
 
 
+def get_write_buffer_size(endpoint: Endpoint) -> int:
+    """Returns how many bytes are still waiting to be written to endpoint."""
+    transport = getattr(endpoint.socket, "transport", None)
+    return transport.get_write_buffer_size() if transport else 0
+
+
+def join_frames(parts: typing.Iterable[str], frame_size: int = 65536) -> typing.Iterator[str]:
+    """Joins encoded messages into encoded message lists of roughly frame_size characters."""
+    frame: typing.List[str] = []
+    size = 0
+    for part in parts:
+        if frame and size + len(part) > frame_size:
+            yield f"[{','.join(frame)}]"
+            frame = []
+            size = 0
+        frame.append(part)
+        size += len(part)
+    if frame:
+        yield f"[{','.join(frame)}]"
+
+
+# JSON of game data packages by (game, checksum), shared by all rooms of a process
+_encoded_game_packages: typing.Dict[typing.Tuple[str, str], str] = {}
+_encoded_game_packages_size = 256
+
+
+def encode_game_package(game: str, game_package: GamesPackage) -> str:
+    """Returns game_package encoded to JSON, reusing earlier encodings of packages with the same checksum."""
+    checksum = game_package.get("checksum", None)
+    if not checksum:
+        return encode(game_package)
+    encoded = _encoded_game_packages.get((game, checksum), None)
+    if encoded is None:
+        while len(_encoded_game_packages) >= _encoded_game_packages_size:
+            del _encoded_game_packages[next(iter(_encoded_game_packages))]  # drop the oldest
+        encoded = _encoded_game_packages[game, checksum] = encode(game_package)
+    return encoded
+
+
 # functions callable on storable data on the server by clients
 modify_functions = {
     # generic:
@@ -212,6 +251,145 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class SaveJournal:
+    """
+    Append-only log of changes on top of a save file, so autosaves only have to write what changed since the last one.
+    Each entry is tagged with the id of the save file it applies to, entries of an older save file are ignored.
+    """
+    journaled_keys = ("received_items", "location_checks", "hints", "stored_data")
+    """save data keys that are journaled as changes, all other keys are written in full with every entry"""
+
+    path: str
+    save_id: typing.Optional[int]
+    size: int
+    """current size of the journal file"""
+    save_size: int
+    """size of the save file, once the journal outgrows it, it gets compacted into a new save file"""
+    received_item_counts: typing.Dict[typing.Tuple[int, int, bool], int]
+    hint_keys: typing.Set[team_slot]
+    """slots whose hints changed since the last entry"""
+    location_checks: typing.Dict[team_slot, typing.Set[int]]
+    """location checks since the last entry, filled in by register_location_checks"""
+    stored_data_keys: typing.Set[str]
+    """data storage keys written to since the last entry"""
+    lock: threading.Lock
+    """guards the changes since the last entry, which are filled on the event loop and taken by the save thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.save_id = None
+        self.size = 0
+        self.save_size = 0
+        self.received_item_counts = {}
+        self.hint_keys = set()
+        self.location_checks = collections.defaultdict(set)
+        self.stored_data_keys = set()
+        self.lock = threading.Lock()
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.save_id is None or self.size >= self.save_size
+
+    def track(self, ctx: Context) -> None:
+        """Remember the current state of ctx, following entries only contain changes on top of it."""
+        self.received_item_counts = {key: len(items) for key, items in ctx.received_items.items()}
+        with self.lock:
+            self.hint_keys = set()
+            self.location_checks = collections.defaultdict(set)
+            self.stored_data_keys = set()
+
+    def add_hint_keys(self, keys: typing.Iterable[team_slot]) -> None:
+        with self.lock:
+            self.hint_keys.update(keys)
+
+    def add_location_checks(self, key: team_slot, locations: typing.Set[int]) -> None:
+        with self.lock:
+            self.location_checks[key] |= locations
+
+    def add_stored_data_key(self, key: str) -> None:
+        with self.lock:
+            self.stored_data_keys.add(key)
+
+    def restart(self, ctx: Context) -> int:
+        """Start journaling on top of a new save file of the current state of ctx, returning the new save id."""
+        self.save_id = (self.save_id or 0) + 1
+        self.track(ctx)
+        return self.save_id
+
+    def get_changes(self, ctx: Context) -> typing.Dict[str, typing.Any]:
+        """Collect changes of ctx since the previous entry."""
+        # swap out first, so checks coming in while this runs end up in the next entry
+        with self.lock:
+            hint_keys, self.hint_keys = self.hint_keys, set()
+            location_checks, self.location_checks = self.location_checks, collections.defaultdict(set)
+            stored_data_keys, self.stored_data_keys = self.stored_data_keys, set()
+        changes = ctx.get_unjournaled_save()
+
+        received_items: typing.Dict[typing.Tuple[int, int, bool], typing.Tuple[int, typing.List[NetworkItem]]] = {}
+        for key, items in ctx.received_items.items():
+            start = self.received_item_counts.get(key, 0)
+            new_items = items[start:]
+            if new_items:
+                # the start index makes replaying idempotent, should an entry overlap its save file
+                received_items[key] = start, new_items
+                self.received_item_counts[key] = start + len(new_items)
+
+        changes["received_items"] = received_items
+        changes["location_checks"] = dict(location_checks)
+        changes["hints"] = {key: frozenset(ctx.hints[key]) for key in hint_keys if key in ctx.hints}
+        changes["stored_data"] = {key: ctx.stored_data[key] for key in stored_data_keys if key in ctx.stored_data}
+        return changes
+
+    def append(self, changes: typing.Dict[str, typing.Any]) -> None:
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        entry = zlib.compress(pickle.dumps((self.save_id, changes)))
+        with open(self.path, "ab") as f:
+            f.write(len(entry).to_bytes(4, "little") + entry)
+        self.size += 4 + len(entry)
+
+    def clear(self, save_size: int) -> None:
+        """Empty the journal after its entries were compacted into a save file of save_size."""
+        with open(self.path, "wb"):
+            pass
+        self.size = 0
+        self.save_size = save_size
+
+    def replay(self, save_data: typing.Dict[str, typing.Any], save_size: int) -> typing.Dict[str, typing.Any]:
+        """Apply the journal entries of save_data to it and continue journaling on top of that save file."""
+        self.save_id = save_data.get("save_id", None)
+        self.save_size = save_size
+        try:
+            with open(self.path, "rb") as f:
+                journal = f.read()
+        except FileNotFoundError:
+            journal = b""
+        self.size = len(journal)
+
+        position = 0
+        while position + 4 <= len(journal):
+            length = int.from_bytes(journal[position:position + 4], "little")
+            entry = journal[position + 4:position + 4 + length]
+            try:
+                save_id, changes = restricted_loads(zlib.decompress(entry))
+            except Exception:
+                break  # cut off while writing
+            position += 4 + length
+            if save_id is None or save_id != self.save_id:
+                continue
+
+            for key, (start, items) in changes.pop("received_items").items():
+                received_items = save_data["received_items"].setdefault(key, [])
+                del received_items[start:]
+                received_items.extend(items)
+            for key, locations in changes.pop("location_checks").items():
+                save_data["location_checks"].setdefault(key, set()).update(locations)
+            for key, hints in changes.pop("hints").items():
+                save_data["hints"][key] = set(hints)
+            save_data["stored_data"].update(changes.pop("stored_data"))
+            save_data.update(changes)
+        return save_data
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -237,6 +415,7 @@ class Context:
     stored_data: typing.Dict[str, object]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
+    stored_data_prefix_notification_clients: typing.Dict[str, typing.Set[Client]]
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
@@ -250,11 +429,14 @@ class Context:
     spheres: typing.List[typing.Dict[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
     logger: logging.Logger
+    text_backlog_limit: int = 1024 * 1024
+    """bytes waiting to be written to a client, above which text messages to it are skipped"""
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
                  hint_cost: int, item_cheat: bool, release_mode: str = "disabled", collect_mode="disabled",
                  countdown_mode: str = "auto", remaining_mode: str = "disabled", auto_shutdown: typing.SupportsFloat = 0, 
-                 compatibility: int = 2, log_network: bool = False, logger: logging.Logger = logging.getLogger()):
+                 compatibility: int = 2, log_network: bool = False, logger: logging.Logger = logging.getLogger(),
+                 data_storage_max_value_size: int = 0):
         self.logger = logger
         super(Context, self).__init__()
         self.slot_info = {}
@@ -264,7 +446,13 @@ class Context:
         self.compatibility: int = compatibility
         self.shutdown_task = None
         self.data_filename = None
-        self.save_filename = None
+        self.save_filename: typing.Optional[str] = None
+        self.save_journal: typing.Optional[SaveJournal] = None
+        # (endpoints, encoded messages without the enclosing list, count of messages if they are all text)
+        self.outbox: typing.List[typing.Tuple[typing.Tuple[Client, ...], str, int]] = []
+        self.outbox_scheduled = False
+        self.handled_messages = 0  # messages received from clients
+        self.handling_time = 0.0  # CPU seconds spent handling them
         self.saving = False
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
@@ -276,7 +464,9 @@ class Context:
         self.password = password
         self.server = None
         self.countdown_timer = 0
-        self.received_items = {}
+        self.received_items: typing.Dict[typing.Tuple[int, int, bool], typing.List[NetworkItem]] = {}
+        self.new_item_slots: typing.Set[team_slot] = set()  # slots with received items not yet sent to clients
+        self.new_items_scheduled = False
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -284,6 +474,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        # (team, finding_player, location) -> current hint for that location, kept in sync with hints
+        self.hint_index: typing.Dict[typing.Tuple[int, int, int], Hint] = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -312,8 +504,12 @@ class Context:
         self.random = random.Random()
         self.stored_data = {}
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        # SetNotify prefixes
+        self.stored_data_prefix_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.data_storage_max_value_size = data_storage_max_value_size  # pickled size in bytes, 0 for no limit
         self.read_data = {}
-        self.spheres = []
+        self._multidata: typing.Mapping[str, typing.Any] = {}
+        self._spheres: typing.Optional[typing.List[typing.Dict[int, typing.Set[int]]]] = []
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -373,6 +569,12 @@ class Context:
     def location_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
+    def get_encoded_data_package(self, games: typing.Iterable[str]) -> str:
+        """Returns an encoded DataPackage message for games, built from cached encodings of each game."""
+        encoded_games = ",".join(f"{encode(game)}:{encode_game_package(game, self.gamespackage[game])}"
+                                 for game in games)
+        return f'[{{"cmd":"DataPackage","data":{{"games":{{{encoded_games}}}}}}}]'
+
     # General networking
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
@@ -420,13 +622,12 @@ class Context:
 
     def broadcast_all(self, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in self.endpoints
             if endpoint.auth and not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast(endpoints, msgs)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
@@ -434,17 +635,59 @@ class Context:
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in itertools.chain.from_iterable(self.clients[team].values())
             if not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
-
-    def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.broadcast(endpoints, msgs)
+
+    def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        """Queues msgs for endpoints. They get encoded right away, so later changes to their contents don't leak
+        into them, and are sent once per event loop iteration, merged with the other messages queued per client.
+        Replies sent directly with send_msgs may arrive before messages queued earlier."""
+        endpoints = tuple(endpoints)
+        if not msgs or not endpoints:
+            return
+        text_count = len(msgs) if all(msg["cmd"] == "PrintJSON" for msg in msgs) else 0
+        self.outbox.append((endpoints, self.dumper(msgs)[1:-1], text_count))
+        if self.outbox_scheduled:
+            return
+        self.outbox_scheduled = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._send_outbox()
+        else:
+            loop.call_soon(self._send_outbox)
+
+    def _send_outbox(self) -> None:
+        self.outbox_scheduled = False
+        outbox, self.outbox = self.outbox, []
+        client_msgs: typing.Dict[Client, typing.List[int]] = collections.defaultdict(list)
+        for index, (endpoints, _, _) in enumerate(outbox):
+            for endpoint in endpoints:
+                client_msgs[endpoint].append(index)
+        # clients receiving the same messages, such as a whole team seeing an item being sent, share one encoding
+        shared_msgs: typing.Dict[typing.Tuple[int, ...], typing.List[Client]] = collections.defaultdict(list)
+        for client, indices in client_msgs.items():
+            if get_write_buffer_size(client) <= self.text_backlog_limit:
+                shared_msgs[tuple(indices)].append(client)
+                continue
+            # falling behind, skip text but keep anything that changes state on the client
+            skipped = sum(outbox[index][2] for index in indices)
+            parts = [outbox[index][1] for index in indices if not outbox[index][2]]
+            if skipped:
+                parts.append(self.dumper({"cmd": "PrintJSON", "data": [{
+                    "text": f"Skipped {skipped} messages, as your connection is falling behind."}]}))
+            for msg in join_frames(parts):
+                async_start(self.send_encoded_msgs(client, msg))
+        # each send writes its frame when its task starts and then waits for the client's buffer to drain,
+        # so frames to a client stay in order, while one slow client doesn't hold up the others
+        for indices, clients in shared_msgs.items():
+            for msg in join_frames(outbox[index][1] for index in indices):
+                for client in clients:
+                    async_start(self.send_encoded_msgs(client, msg))
 
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
@@ -457,14 +700,13 @@ class Context:
         if not client.auth or client.no_text:
             return
         self.logger.info("Notice (Player %s in team %d): %s" % (client.name, client.team + 1, text))
-        async_start(self.send_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}]))
+        self.broadcast((client,), [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}])
 
     def notify_client_multiple(self, client: Client, texts: typing.List[str], additional_arguments: dict = {}):
         if not client.auth or client.no_text:
             return
-        async_start(self.send_msgs(client,
-                                   [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
-                                    for text in texts]))
+        self.broadcast((client,), [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
+                                   for text in texts])
 
     # loading
     def load(self, multidatapath: str, use_embedded_server_options: bool = False):
@@ -485,8 +727,10 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
         format_version = data[0]
+        if format_version == SectionedMultiData.format_version:
+            return SectionedMultiData(data)
         if format_version > 3:
             raise Utils.VersionException("Incompatible multidata.")
         return restricted_loads(zlib.decompress(data[1:]))
@@ -534,18 +778,20 @@ class Context:
         self.random.seed(self.seed_name)
         self.connect_names = decoded_obj['connect_names']
         self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
+        # slot data of sectioned multidata is only decompressed for slots that request it
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
-                             for player, loc_data in decoded_obj["er_hint_data"].items()}
+                             for player, loc_data in decoded_obj.pop("er_hint_data").items()}
 
         # load start inventory:
-        for slot, item_codes in decoded_obj["precollected_items"].items():
+        for slot, item_codes in decoded_obj.pop("precollected_items").items():
             self.start_inventory[slot] = [NetworkItem(item_code, -2, 0) for item_code in item_codes]
 
-        for slot, hints in decoded_obj["precollected_hints"].items():
+        for slot, hints in decoded_obj.pop("precollected_hints").items():
             self.hints[0, slot].update(hints)
+        self.index_hints()
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -574,8 +820,21 @@ class Context:
         for game_name, data in self.location_name_groups.items():
             self.read_data[f"location_name_groups_{game_name}"] = lambda lgame=game_name: self.location_name_groups[lgame]
 
-        # sorted access spheres
-        self.spheres = decoded_obj.get("spheres", [])
+        # sorted access spheres, loaded when first needed
+        if isinstance(decoded_obj, SectionedMultiData):
+            # only keep the compressed sections that are still read, so the rest of the multidata can be freed
+            decoded_obj.retain(("slot_data", "spheres"))
+            self._multidata = decoded_obj
+            self._spheres = None
+        else:
+            self._spheres = decoded_obj.get("spheres", [])
+
+    @property
+    def spheres(self) -> typing.List[typing.Dict[int, typing.Set[int]]]:
+        if self._spheres is None:
+            self._spheres = self._multidata.get("spheres", [])
+            self._multidata = {}  # slot_data keeps its own reference
+        return self._spheres
 
     # saving
 
@@ -592,12 +851,24 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
+            if self.save_journal and not exit_save and not self.save_journal.needs_compaction:
+                self.save_journal.append(self.save_journal.get_changes(self))
+                return True
+
+            save_id = self.save_journal.restart(self) if self.save_journal else None
+            save_data = self.get_save()
+            if save_id is not None:
+                save_data["save_id"] = save_id
             # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
+            encoded_save = zlib.compress(pickle.dumps(save_data))
             with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+                f.write(encoded_save)
+            if self.save_journal:
+                self.save_journal.clear(len(encoded_save))
         except Exception as e:
             self.logger.exception(e)
+            if self.save_journal:
+                self.save_journal.save_size = 0  # whatever the journal missed has to go into a new save file
             return False
         else:
             return True
@@ -610,14 +881,17 @@ class Context:
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
+            self.save_journal = SaveJournal(self.save_filename + '.journal')
             try:
                 with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                    encoded_save = f.read()
+                save_data = restricted_loads(zlib.decompress(encoded_save))
+                self.set_save(self.save_journal.replay(save_data, len(encoded_save)))
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
                 self.logger.exception(e)
+            self.save_journal.track(self)
             self._start_async_saving()
 
     def _start_async_saving(self, atexit_save: bool = True):
@@ -651,15 +925,23 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
+    def get_save(self) -> typing.Dict[str, typing.Any]:
         self.recheck_hints()
+        d = self.get_unjournaled_save()
+        d.update({
+            "received_items": self.received_items,
+            "hints": dict(self.hints),
+            "location_checks": dict(self.location_checks),
+            "stored_data": self.stored_data,
+        })
+        return d
+
+    def get_unjournaled_save(self) -> typing.Dict[str, typing.Any]:
+        """The save data that SaveJournal writes in full with every entry, all but its journaled_keys."""
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
-            "received_items": self.received_items,
             "hints_used": dict(self.hints_used),
-            "hints": dict(self.hints),
-            "location_checks": dict(self.location_checks),
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -668,7 +950,6 @@ class Context:
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
@@ -680,7 +961,7 @@ class Context:
 
         return d
 
-    def set_save(self, savedata: dict):
+    def set_save(self, savedata: typing.Dict[str, typing.Any]):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
         if savedata["version"] > self.save_version:
@@ -717,6 +998,7 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+        self.recheck_hints()
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -735,6 +1017,10 @@ class Context:
         will refresh all teams or all slots respectively. If a set is passed for 'changed', each (team,slot)
         pair that has at least one hint modified will be added to the set.
         """
+        full_refresh = team is None and slot is None
+        # a full refresh also picks up hints that were added to self.hints directly. The new index is built on the
+        # side and swapped in at once, as this also runs on the autosave thread while get_hint uses the live one
+        hint_index = {} if full_refresh else self.hint_index
         for hint_team, hint_slot in self.hints:
             if team != hint_team and team is not None:
                 continue  # Check specified team only, all if team is None
@@ -744,6 +1030,7 @@ class Context:
             for hint in self.hints[hint_team, hint_slot]:
                 new_hint = hint.re_check(self, hint_team)
                 new_hints.add(new_hint)
+                hint_index[hint_team, new_hint.finding_player, new_hint.location] = new_hint
                 if hint == new_hint:
                     continue
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
@@ -751,12 +1038,37 @@ class Context:
                         changed.add((hint_team,player))
                     if slot is not None and slot != player:
                         self.replace_hint(hint_team, player, hint, new_hint)
+            if self.save_journal and new_hints != self.hints[hint_team, hint_slot]:
+                self.save_journal.add_hint_keys(((hint_team, hint_slot),))
             self.hints[hint_team, hint_slot] = new_hints
+        if full_refresh:
+            self.hint_index = hint_index
+
+    def recheck_location_hints(self, team: int, finding_player: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints for the given locations of finding_player, such as newly checked ones.
+        Like recheck_hints, each (team,slot) pair that has at least one hint modified will be added to 'changed'."""
+        for location in locations:
+            hint = self.hint_index.get((team, finding_player, location))
+            if hint is None:
+                continue
+            new_hint = hint.re_check(self, team)
+            if hint == new_hint:
+                continue
+            for player in self.slot_set(hint.receiving_player) | {finding_player}:
+                if changed is not None:
+                    changed.add((team, player))
+                self.replace_hint(team, player, hint, new_hint)
 
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
         return self.hints[team, slot]
 
+    def index_hints(self) -> None:
+        """Rebuild hint_index from self.hints, for when hints were loaded or replaced wholesale."""
+        self.hint_index = {(team, hint.finding_player, hint.location): hint
+                           for (team, _), hints in self.hints.items() for hint in hints}
+
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
@@ -811,9 +1123,10 @@ class Context:
         concerns = collections.defaultdict(list)
         for hint in sorted(hints, key=operator.attrgetter('found'), reverse=True):
             data = (hint, hint.as_network_message())
-            for player in self.slot_set(hint.receiving_player):
+            receiving_slots = self.slot_set(hint.receiving_player)
+            for player in receiving_slots:
                 concerns[player].append(data)
-            if not hint.local and data not in concerns[hint.finding_player]:
+            if not hint.local and hint.finding_player not in receiving_slots:
                 concerns[hint.finding_player].append(data)
 
             # For !hint use cases, only hints that were not already found at the time of creation should be remembered
@@ -823,12 +1136,15 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.hint_index[team, hint.finding_player, hint.location] = hint
                     new_hint_events.add(hint.finding_player)
-                    for player in self.slot_set(hint.receiving_player):
+                    for player in receiving_slots:
                         self.hints[team, player].add(hint)
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
+        if self.save_journal:
+            self.save_journal.add_hint_keys((team, slot) for slot in new_hint_events)
         for slot in new_hint_events:
             self.on_new_hint(team, slot)
         for slot, hint_data in concerns.items():
@@ -837,19 +1153,18 @@ class Context:
                 if not clients:
                     continue
                 client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
-                for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                self.broadcast(clients, client_hints)
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        return self.hint_index.get((team, finding_player, seeked_location), None)
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.hint_index[team, new_hint.finding_player, new_hint.location] = new_hint
+            if self.save_journal:
+                self.save_journal.add_hint_keys(((team, slot),))
     
     # "events"
 
@@ -872,24 +1187,30 @@ class Context:
 
     def on_changed_hints(self, team: int, slot: int):
         key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.get_stored_data_notification_clients(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
 
     def on_client_status_change(self, team: int, slot: int):
         key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
+        targets: typing.Set[Client] = self.get_stored_data_notification_clients(key)
         if targets:
             self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
 
+    # data storage
 
-def update_aliases(ctx: Context, team: int):
-    cmd = ctx.dumper([{"cmd": "RoomUpdate",
-                       "players": ctx.get_players_package()}])
+    def get_stored_data_notification_clients(self, key: str) -> typing.Set[Client]:
+        """Returns the clients that registered for key with SetNotify, either directly or by a prefix of it."""
+        targets: typing.Set[Client] = set(self.stored_data_notification_clients.get(key, ()))
+        for prefix, clients in self.stored_data_prefix_notification_clients.items():
+            if key.startswith(prefix):
+                targets.update(clients)
+        return targets
 
-    for clients in ctx.clients[team].values():
-        for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+
+def update_aliases(ctx: Context, team: int):
+    ctx.broadcast(itertools.chain.from_iterable(ctx.clients[team].values()),
+                  [{"cmd": "RoomUpdate", "players": ctx.get_players_package()}])
 
 
 async def server(websocket: "ServerConnection", path: str = "/", ctx: Context = None) -> None:
@@ -905,8 +1226,12 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
         async for data in websocket:
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
+            # CPU time of the thread, so waiting on slow clients doesn't count, unless other rooms run meanwhile
+            start = time.thread_time()
             for msg in decode(data):
                 await process_client_cmd(ctx, client, msg)
+                ctx.handled_messages += 1
+            ctx.handling_time += time.thread_time() - start
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
             ctx.logger.exception(e)
@@ -1072,20 +1397,35 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    """Sends items received by ctx.new_item_slots to their clients.
+    Calls within the same event loop iteration are coalesced into one ReceivedItems per client."""
+    if ctx.new_items_scheduled or not ctx.new_item_slots:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _send_new_items(ctx)
+    else:
+        ctx.new_items_scheduled = True
+        loop.call_soon(_send_new_items, ctx)
+
+
+def _send_new_items(ctx: Context):
+    ctx.new_items_scheduled = False
+    new_item_slots, ctx.new_item_slots = ctx.new_item_slots, set()
+    for team, slot in new_item_slots:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                ctx.broadcast((client,), [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}])
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1133,6 +1473,7 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.new_item_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1170,6 +1511,8 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
+        if ctx.save_journal:
+            ctx.save_journal.add_location_checks((team, slot), new_locations)
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
@@ -1177,7 +1520,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1669,6 +2012,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_item_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1686,9 +2030,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.get_rechecked_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1846,7 +2188,7 @@ def get_slot_points(ctx: Context, team: int, slot: int) -> int:
             ctx.get_hint_cost(slot) * ctx.hints_used[team, slot])
 
 
-async def process_client_cmd(ctx: Context, client: Client, args: dict):
+async def process_client_cmd(ctx: Context, client: Client, args: typing.Dict[str, typing.Any]):
     try:
         cmd: str = args["cmd"]
     except:
@@ -1936,23 +2278,15 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = [name for name in ctx.gamespackage if name not in exclusions]
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = list(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.get_encoded_data_package(games))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -2145,13 +2479,10 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             tags = set(args.get("tags", []))
             slots = set(args.get("slots", []))
             args["cmd"] = "Bounced"
-            msg = ctx.dumper([args])
-
-            for bounceclient in ctx.endpoints:
-                if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
-                                                         set(bounceclient.tags) & tags or
-                                                         bounceclient.slot in slots):
-                    await ctx.send_encoded_msgs(bounceclient, msg)
+            ctx.broadcast((bounceclient for bounceclient in ctx.endpoints
+                           if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
+                                                                    set(bounceclient.tags) & tags or
+                                                                    bounceclient.slot in slots)), [args])
 
         elif cmd == "Get":
             if "keys" not in args or type(args["keys"]) != list:
@@ -2173,28 +2504,47 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'Set', "original_cmd": cmd}])
                 return
+            key = args["key"]
             args["cmd"] = "SetReply"
-            value = ctx.stored_data.get(args["key"], args.get("default", 0))
-            args["original_value"] = copy.copy(value)
-            args["slot"] = client.slot
+            value = ctx.stored_data.get(key, args.get("default", 0))
+            targets = ctx.get_stored_data_notification_clients(key)
+            want_reply = args.get("want_reply", False)
+            if want_reply:
+                targets.discard(client)  # replied to directly, so it stays in order with the replies to its packets
+            # operations may modify the value in place, only copy it if the original is needed
+            original_value = copy.copy(value) if targets or want_reply or ctx.data_storage_max_value_size else value
             for operation in args["operations"]:
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
-            if args.get("want_reply", False):
-                targets.add(client)
-            if targets:
-                ctx.broadcast(targets, [args])
+            if ctx.data_storage_max_value_size and len(pickle.dumps(value)) > ctx.data_storage_max_value_size:
+                if key in ctx.stored_data:
+                    ctx.stored_data[key] = original_value
+                await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
+                                              "text": 'Set: Value too large', "original_cmd": cmd}])
+                return
+            ctx.stored_data[key] = args["value"] = value
+            if ctx.save_journal:
+                ctx.save_journal.add_stored_data_key(key)
+            if targets or want_reply:
+                args["original_value"] = original_value
+                args["slot"] = client.slot
+                if targets:
+                    ctx.broadcast(targets, [args])
+                if want_reply:
+                    await ctx.send_msgs(client, [args])
             ctx.save()
 
         elif cmd == "SetNotify":
-            if "keys" not in args or type(args["keys"]) != list:
+            prefixes = args.get("prefixes", [])
+            if "keys" not in args or type(args["keys"]) != list or type(prefixes) != list or \
+                    not all(prefix and type(prefix) == str for prefix in prefixes):
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
             for key in args["keys"]:
                 ctx.stored_data_notification_clients[key].add(client)
+            for prefix in prefixes:
+                ctx.stored_data_prefix_notification_clients[prefix].add(client)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2637,6 +2987,8 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--data_storage_max_value_size', default=defaults["data_storage_max_value_size"], type=int,
+                        help="largest size in bytes a data storage value may grow to through Set, 0 for no limit")
     args = parser.parse_args()
     return args
 
@@ -2683,7 +3035,8 @@ async def main(args: argparse.Namespace):
     ctx = Context(args.host, args.port, args.server_password, args.password, args.location_check_points,
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.countdown_mode, args.remaining_mode,
-                  args.auto_shutdown, args.compatibility, args.log_network)
+                  args.auto_shutdown, args.compatibility, args.log_network,
+                  data_storage_max_value_size=args.data_storage_max_value_size)
     data_filename = args.multidata
 
     if not data_filename:
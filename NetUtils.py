@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-from collections.abc import Mapping, Sequence
+from collections.abc import Mapping, MutableMapping, Sequence
 import typing
 import enum
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, Version, ZlibWriter, restricted_dump, restricted_dumps, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -415,6 +416,11 @@ class Hint(typing.NamedTuple):
 
 
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    _item_index: typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int]]]
+    """(receiving player, item id) -> [(finding player, location id)]"""
+    _receiver_index: typing.Dict[int, typing.Dict[int, typing.List[int]]]
+    """receiving player -> finding player -> [location id]"""
+
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
 
@@ -427,21 +433,25 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        # reverse lookups, so hints and collects only have to look at the locations they return
+        self._item_index = {}
+        self._receiver_index = {}
+        for finding_player, check_data in self.items():
+            for location_id, (item_id, receiving_player, _) in check_data.items():
+                self._item_index.setdefault((receiving_player, item_id), []).append((finding_player, location_id))
+                self._receiver_index.setdefault(receiving_player, {}) \
+                    .setdefault(finding_player, []).append(location_id)
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        for receiving_player in slots:
+            for finding_player, location_id in self._item_index.get((receiving_player, seeked_item_id), ()):
+                yield (finding_player, location_id, seeked_item_id, receiving_player,
+                       self[finding_player][location_id][2])
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
-        import collections
-        all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
-        return all_locations
+        return {source_slot: set(location_ids)
+                for source_slot, location_ids in self._receiver_index.get(slot, {}).items()}
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
@@ -510,6 +520,158 @@ class MultiData(typing.TypedDict):
     race_mode: int
 
 
+SectionKey = typing.Union[str, tuple[str, int]]
+
+
+class SectionedMultiData(MutableMapping[str, typing.Any]):
+    """
+    Multidata of format version 4, in which every key is compressed separately and only decompressed when accessed.
+    The keys in split_keys, like slot_data, are stored with a separate section for each slot.
+
+    Layout: format version byte, compressed sections, index of section key -> (offset, size) or None for split keys,
+    index size as 4 bytes little endian.
+    """
+    format_version: typing.ClassVar[int] = 4
+    split_keys: typing.ClassVar[frozenset[str]] = frozenset({"slot_data"})
+
+    _data: memoryview
+    _index: dict[SectionKey, tuple[int, int] | None]
+    _keys: list[str]
+    _decoded: dict[str, typing.Any]
+
+    def __init__(self, data: bytes) -> None:
+        self._data = memoryview(data)
+        index_size = int.from_bytes(self._data[-4:], "little")
+        self._index = restricted_loads(self._data[-4 - index_size:-4])
+        self._keys = [key for key in self._index if isinstance(key, str)]
+        self._decoded = {}
+
+    def load_section(self, section_key: SectionKey) -> typing.Any:
+        offset, size = self._index[section_key]
+        return restricted_loads(zlib.decompress(self._data[offset:offset + size]))
+
+    def get_raw_section(self, section_key: SectionKey) -> memoryview | None:
+        """Returns the compressed data of a section that was never decompressed, so it can't have been modified."""
+        if isinstance(section_key, tuple):
+            split_value = self._decoded.get(section_key[0], None)
+            if split_value is not None and (not isinstance(split_value, _SplitSection)
+                                            or section_key[1] in split_value.decoded):
+                return None
+        elif section_key in self._decoded:
+            return None
+        location = self._index.get(section_key, None)
+        if location is None:
+            return None
+        offset, size = location
+        return self._data[offset:offset + size]
+
+    def retain(self, keys: typing.Collection[str]) -> None:
+        """Drops all other keys and copies the sections of keys out of the data, so the rest of it can be freed."""
+        data = bytearray([self.format_version])
+        index: dict[SectionKey, tuple[int, int] | None] = {}
+        for section_key, location in self._index.items():
+            if (section_key if isinstance(section_key, str) else section_key[0]) not in keys:
+                continue
+            if location is None:
+                index[section_key] = None
+            else:
+                offset, size = location
+                index[section_key] = len(data), size
+                data += self._data[offset:offset + size]
+        self._data = memoryview(bytes(data))
+        self._index = index
+        self._keys = [key for key in self._keys if key in keys]
+        self._decoded = {key: value for key, value in self._decoded.items() if key in keys}
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key not in self._decoded:
+            if key not in self._keys:
+                raise KeyError(key)
+            if self._index[key] is None:
+                self._decoded[key] = _SplitSection(self, key)
+            else:
+                self._decoded[key] = self.load_section(key)
+        return self._decoded[key]
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        if key not in self._keys:
+            self._keys.append(key)
+        self._decoded[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        self._keys.remove(key)
+        self._decoded.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class _SplitSection(Mapping[int, typing.Any]):
+    """Value of a split key of SectionedMultiData, decompressing the section of each slot when accessed."""
+    def __init__(self, multidata: SectionedMultiData, key: str) -> None:
+        self.multidata = multidata
+        self.key = key
+        self.slots = [section_key[1] for section_key in multidata._index
+                      if isinstance(section_key, tuple) and section_key[0] == key]
+        self.decoded: dict[int, typing.Any] = {}
+
+    def __getitem__(self, slot: int) -> typing.Any:
+        if slot not in self.decoded:
+            if slot not in self.slots:
+                raise KeyError(slot)
+            self.decoded[slot] = self.multidata.load_section((self.key, slot))
+        return self.decoded[slot]
+
+    def __contains__(self, slot: object) -> bool:
+        return slot in self.slots
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self.slots)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+
+def dump_sectioned_multidata(multidata: Mapping[str, typing.Any], file: typing.IO[bytes],
+                             compression_level: int = 9) -> None:
+    """
+    Writes multidata in the format of SectionedMultiData, starting with the format version, to file.
+    Sections of a SectionedMultiData that were never accessed are copied without decompressing them.
+    """
+    index: dict[SectionKey, tuple[int, int] | None] = {}
+    start = file.tell()
+    file.write(bytes([SectionedMultiData.format_version]))
+
+    def write_section(section_key: SectionKey, get_value: typing.Callable[[], typing.Any]) -> None:
+        offset = file.tell()
+        raw = multidata.get_raw_section(section_key) if isinstance(multidata, SectionedMultiData) else None
+        if raw is None:
+            with ZlibWriter(file, compression_level) as compressed:
+                restricted_dump(get_value(), compressed)
+        else:
+            file.write(raw)
+        index[section_key] = offset - start, file.tell() - offset
+
+    for key in multidata:
+        if key in SectionedMultiData.split_keys:
+            split_value = multidata[key]
+            index[key] = None
+            for slot in split_value:
+                write_section((key, slot), lambda slot=slot: split_value[slot])
+        else:
+            write_section(key, lambda key=key: multidata[key])
+
+    encoded_index = restricted_dumps(index)
+    file.write(encoded_index)
+    file.write(len(encoded_index).to_bytes(4, "little"))
+
+
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
     LocationStore = _LocationStore
 else:
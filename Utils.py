@@ -13,13 +13,16 @@ import pickle
 import functools
 import io
 import collections
+import contextlib
 import importlib
 import logging
+import types
 import warnings
+import zlib
 
 from argparse import Namespace
 from settings import Settings, get_settings
-from time import sleep
+from time import perf_counter, sleep
 from typing import BinaryIO, Coroutine, Optional, Set, Dict, Any, Union, TypeGuard
 from yaml import load, load_all, dump
 
@@ -485,16 +488,53 @@ def restricted_loads(s: bytes) -> Any:
     return RestrictedUnpickler(io.BytesIO(s)).load()
 
 
+class RestrictedPickler(pickle.Pickler):
+    """Pickler that raises pickle.PicklingError when writing a global that RestrictedUnpickler would not load."""
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.unpickler = RestrictedUnpickler(io.BytesIO())
+
+    def reducer_override(self, obj: Any) -> Any:
+        # instances reference their class or reduce function, so checking classes and functions covers everything
+        if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+            name = obj.__qualname__
+            try:
+                self.unpickler.find_class(pickle.whichmodule(obj, name), name)
+            except pickle.UnpicklingError as e:
+                raise pickle.PicklingError(e) from e
+        return NotImplemented
+
+
+def restricted_dump(obj: Any, file: typing.IO[bytes]) -> None:
+    """Helper function analogous to pickle.dump(), writing only what restricted_loads can load."""
+    RestrictedPickler(file).dump(obj)
+
+
 def restricted_dumps(obj: Any) -> bytes:
-    """Helper function analogous to pickle.dumps()."""
-    s = pickle.dumps(obj)
-    # Assert that the string can be successfully loaded by restricted_loads
-    try:
-        restricted_loads(s)
-    except pickle.UnpicklingError as e:
-        raise pickle.PicklingError(e) from e
+    """Helper function analogous to pickle.dumps(), writing only what restricted_loads can load."""
+    file = io.BytesIO()
+    restricted_dump(obj, file)
+    return file.getvalue()
+
+
+class ZlibWriter:
+    """Writable binary file that compresses everything written to it into file as one zlib stream when closed."""
+    def __init__(self, file: typing.IO[bytes], level: int = zlib.Z_DEFAULT_COMPRESSION) -> None:
+        self.file = file
+        self.compressor = zlib.compressobj(level)
+
+    def write(self, data: bytes) -> int:
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def close(self) -> None:
+        self.file.write(self.compressor.flush())
 
-    return s
+    def __enter__(self) -> ZlibWriter:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
 
 
 class ByValue:
@@ -524,6 +564,134 @@ class KeyedDefaultDict(collections.defaultdict):
         return value
 
 
+class CopyOnWriteDict(typing.Dict[S, T]):
+    """
+    dict whose values can be shared with other CopyOnWriteDicts until they are modified.
+    Subscribing a shared value copies it into this dict first, as the caller may modify it, so sharing the whole dict
+    only costs a copy of the values that are actually modified afterwards.
+    Callers that only read a value use peek, which never copies.
+    """
+    __slots__ = ("shared",)
+    shared: typing.Dict[typing.Any, typing.Any]
+    """values that may also be referenced by other CopyOnWriteDicts, never modified in place"""
+
+    def __init__(self, seq: typing.Union[typing.Mapping, typing.Iterable, None] = None, **kwargs) -> None:
+        if seq is not None:
+            super().__init__(seq, **kwargs)
+        else:
+            super().__init__(**kwargs)
+        self.shared = {}
+
+    def __missing__(self, key):
+        self[key] = value = self.shared[key].copy()
+        return value
+
+    def peek(self, key: S) -> T:
+        """Returns the value of key without copying it if it is shared. The returned value must not be modified."""
+        value: typing.Optional[T] = dict.get(self, key)
+        if value is None:
+            return self.shared[key]
+        return value
+
+    def share(self) -> CopyOnWriteDict:
+        """Returns a new CopyOnWriteDict with the same contents, sharing all values with this one."""
+        if dict.__len__(self):
+            shared = self.shared.copy()
+            shared.update(dict.items(self))
+            dict.clear(self)
+            self.shared = shared
+        new = CopyOnWriteDict()
+        new.shared = self.shared
+        return new
+
+    def materialize(self) -> None:
+        """Copies all still shared values into this dict."""
+        shared = self.shared
+        if shared:
+            for key, value in shared.items():
+                if not dict.__contains__(self, key):
+                    self[key] = value.copy()
+            self.shared = {}
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def pop(self, key, *default):
+        self.materialize()
+        return super().pop(key, *default)
+
+    def popitem(self):
+        self.materialize()
+        return super().popitem()
+
+    def clear(self) -> None:
+        super().clear()
+        self.shared = {}
+
+    def __delitem__(self, key) -> None:
+        self.pop(key)
+
+    def __contains__(self, key) -> bool:
+        return dict.__contains__(self, key) or key in self.shared
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, dict):
+            return NotImplemented
+        if self.keys() != other.keys():
+            return False
+        other_peek = other.peek if isinstance(other, CopyOnWriteDict) else other.__getitem__
+        for key in self.keys():
+            if self.peek(key) != other_peek(key):
+                return False
+        return True
+
+    def __ne__(self, other: object) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self) -> str:
+        self.materialize()
+        return super().__repr__()
+
+    def keys(self):
+        shared = self.shared
+        if not shared:
+            return super().keys()
+        # values copied out of shared keep their key in shared, so only keys added since sharing need a materialize
+        if dict.keys(self) <= shared.keys():
+            return shared.keys()
+        self.materialize()
+        return super().keys()
+
+    def values(self):
+        self.materialize()
+        return super().values()
+
+    def items(self):
+        self.materialize()
+        return super().items()
+
+    def copy(self) -> typing.Dict[typing.Any, typing.Any]:
+        self.materialize()
+        return dict(super().items())
+
+
 def get_text_between(text: str, start: str, end: str) -> str:
     return text[text.index(start) + len(start): text.rindex(end)]
 
@@ -1254,3 +1422,113 @@ def get_all_causes(ex: Exception) -> str:
     top = causes[-1]
     others = "".join(f"\n{' ' * (i + 1)}Which caused: {c}" for i, c in enumerate(reversed(causes[:-1])))
     return f"{top}{others}"
+
+
+class GenerationProfile:
+    """
+    Collects wall times of a generation for Generate.py --profile: named sections like fill and progression balancing,
+    the world methods of every player and the access rules of locations and entrances.
+    Times of nested sections and rules that reach other rules are included in the outer ones.
+    """
+    sections: Dict[str, typing.List[float]]
+    """section name -> [calls, seconds]"""
+    player_methods: Dict[int, Dict[str, float]]
+    """player -> method name -> seconds"""
+    stage_methods: Dict[str, float]
+    """qualified name of stage method -> seconds"""
+    rules: Dict[str, typing.List[float]]
+    """access rule name -> [calls, seconds]"""
+
+    def __init__(self) -> None:
+        import threading
+        self.sections = {}
+        self.player_methods = collections.defaultdict(lambda: collections.defaultdict(float))
+        self.stage_methods = collections.defaultdict(float)
+        self.rules = {}
+        self._lock = threading.Lock()  # worlds' methods, output and rules may run concurrently
+
+    def add_section(self, name: str, seconds: float) -> None:
+        with self._lock:
+            section = self.sections.setdefault(name, [0, 0.0])
+            section[0] += 1
+            section[1] += seconds
+
+    def add_method(self, method: typing.Callable[..., Any], seconds: float, player: Optional[int] = None) -> None:
+        with self._lock:
+            if player:
+                self.player_methods[player][method.__name__] += seconds
+            else:
+                self.stage_methods[method.__qualname__] += seconds
+
+    @contextlib.contextmanager
+    def section(self, name: str) -> typing.Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_section(name, perf_counter() - start)
+
+    def timed(self, name: str, function: typing.Callable[..., RetType]) -> typing.Callable[..., RetType]:
+        """Returns function recording its calls as section name."""
+        @functools.wraps(function)
+        def timed_function(*args: Any, **kwargs: Any) -> RetType:
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add_section(name, perf_counter() - start)
+
+        return timed_function
+
+    @staticmethod
+    def get_rule_name(rule: typing.Callable[..., Any]) -> str:
+        """Name of functions, lambdas and methods including where they are defined, otherwise the type's name."""
+        code = getattr(rule, "__code__", None) or getattr(getattr(rule, "__func__", None), "__code__", None)
+        if code:
+            return f"{rule.__module__}.{rule.__qualname__} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return get_full_typename(type(rule))
+
+    def timed_rule(self, rule: typing.Callable[[Any], bool]) -> typing.Callable[[Any], bool]:
+        stats = self.rules.setdefault(self.get_rule_name(rule), [0, 0.0])
+        lock = self._lock
+
+        def timed_access_rule(state: Any) -> bool:
+            start = perf_counter()
+            try:
+                return rule(state)
+            finally:
+                taken = perf_counter() - start
+                with lock:
+                    stats[0] += 1
+                    stats[1] += taken
+
+        return timed_access_rule
+
+    def time_rules(self, spots: typing.Iterable[Any]) -> None:
+        """Replaces access rules of locations and entrances that have one with timed ones."""
+        for spot in spots:
+            if spot.access_rule is not type(spot).access_rule:  # skip the default rule
+                spot.access_rule = self.timed_rule(spot.access_rule)
+
+    def to_dict(self, player_names: typing.Mapping[int, str], games: typing.Mapping[int, str],
+                top_rules: int = 25) -> Dict[str, Any]:
+        """Returns the report as JSON serializable dict, with the slowest worlds, games and rules first."""
+        players = sorted(self.player_methods, key=lambda player: sum(self.player_methods[player].values()),
+                         reverse=True)
+        game_seconds: Dict[str, float] = collections.Counter()
+        for player in players:
+            game_seconds[games[player]] += sum(self.player_methods[player].values())
+        rules = sorted(self.rules.items(), key=lambda rule: rule[1][1], reverse=True)[:top_rules]
+        return {
+            "sections": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.sections.items()},
+            "games": dict(sorted(game_seconds.items(), key=lambda game: game[1], reverse=True)),
+            "worlds": [{
+                "player": player,
+                "name": player_names[player],
+                "game": games[player],
+                "seconds": sum(self.player_methods[player].values()),
+                "methods": dict(self.player_methods[player]),
+            } for player in players],
+            "stage_methods": dict(self.stage_methods),
+            "access_rules": [{"rule": name, "calls": calls, "seconds": seconds} for name, (calls, seconds) in rules],
+        }
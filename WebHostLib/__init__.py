@@ -37,6 +37,10 @@ app.config["MAX_FORM_MEMORY_SIZE"] = 2 * 1024 * 1024  # 2 MB, needed for large o
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
+# fraction of CPU time a room spends handling messages, above which it gets a hoster to itself when it starts again
+app.config["HOT_ROOM_LOAD"] = 0.25
+# resident memory of a room hoster in bytes, above which new rooms go to other hosters if possible. 0 for no limit
+app.config["HOSTER_MEMORY_LIMIT"] = 2147483648
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
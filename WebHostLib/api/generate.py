@@ -1,4 +1,5 @@
 import json
+import time
 from uuid import UUID
 
 from flask import request, session, url_for
@@ -82,4 +83,11 @@ def wait_seed_api(seed: UUID):
         return {"text": "Generation not found"}, 404
     elif generation.state == STATE_ERROR:
         return {"text": "Generation failed"}, 500
+    elif generation.state == STATE_QUEUED:
+        queue = json.loads(generation.meta).get("queue")
+        if queue:
+            text = f"Generation queued at position {queue['position']}"
+            if "eta" in queue:
+                text += f", expected to start in about {max(0, queue['eta'] - int(time.time())) // 60 + 1} minute(s)"
+            return {"text": text, "queue": queue}, 202
     return {"text": "Generation running"}, 202
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import collections
 import json
 import logging
+import math
 import multiprocessing
+import os
+import queue
+import signal
+import time
 import typing
 from datetime import timedelta, datetime
 from threading import Event, Thread
@@ -15,6 +21,8 @@ from Utils import restricted_loads
 from .locker import Locker, AlreadyRunningException
 
 _stop_event = Event()
+new_room_load = 0.01  # assumed load of a room until its process reports it, spreads rooms started at once
+_started_generations: multiprocessing.Queue | None = None  # generator process side, receives (sid, pid) per job
 
 
 def stop() -> None:
@@ -46,18 +54,21 @@ def _mp_gen_game(
     from setproctitle import setproctitle
 
     setproctitle(f"Generator ({sid})")
+    if _started_generations:
+        _started_generations.put((sid, os.getpid()))
     try:
         return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
     finally:
         setproctitle(f"Generator (idle)")
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None) -> None:
+def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation,
+                     timeout: int|None) -> multiprocessing.pool.AsyncResult | None:
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
         logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(
+        result = pool.apply_async(
             _mp_gen_game,
             (options,),
             {
@@ -73,14 +84,21 @@ def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, ti
         generation.state = STATE_ERROR
         commit()
         logging.exception(e)
+        return None
     else:
         generation.state = STATE_STARTED
+        return result
 
 
-def init_generator(config: dict[str, Any]) -> None:
+def init_generator(config: dict[str, Any], started_generations: multiprocessing.Queue | None = None) -> None:
     from setproctitle import setproctitle
 
+    global _started_generations
+    _started_generations = started_generations
+
     setproctitle("Generator (idle)")
+    import worlds  # load all worlds before the first job, instead of while the first one waits
+    del worlds
 
     try:
         import resource
@@ -113,6 +131,19 @@ def cleanup():
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
 
 
+def pick_hoster(hosters: typing.Sequence[MultiworldInstance], hot: bool) -> MultiworldInstance:
+    """Returns the hoster a new room should be started on, the least loaded one that is not busy with a hot room.
+    Hot rooms prefer a hoster without any rooms, so they get a process to themselves.
+    Hosters above their memory limit are only picked if all of them are, and equally loaded ones are told apart by
+    their memory."""
+    if hot:
+        return min(hosters, key=lambda hoster: (hoster.over_memory_limit, bool(hoster.room_ids),
+                                                bool(hoster.hot_room_ids), hoster.load, hoster.memory,
+                                                len(hoster.room_ids)))
+    return min(hosters, key=lambda hoster: (hoster.over_memory_limit, bool(hoster.hot_room_ids), hoster.load,
+                                            hoster.memory, len(hoster.room_ids)))
+
+
 def autohost(config: dict):
     def keep_running():
         stop_event = _stop_event
@@ -124,8 +155,14 @@ def autohost(config: dict):
                     hoster = MultiworldInstance(config, x)
                     hosters.append(hoster)
                     hoster.start()
+                # rooms that were last seen above HOT_ROOM_LOAD, to be placed on their own when they start again
+                hot_room_ids: typing.Set[UUID] = set()
 
                 while not stop_event.wait(0.1):
+                    for hoster in hosters:
+                        hoster.update()
+                        hot_room_ids -= hoster.room_loads.keys() - hoster.hot_room_ids
+                        hot_room_ids |= hoster.hot_room_ids
                     with db_session:
                         rooms = select(
                             room for room in Room if
@@ -133,7 +170,8 @@ def autohost(config: dict):
                         for room in rooms:
                             # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
                             if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                                if not any(room.id in hoster.room_ids for hoster in hosters):
+                                    pick_hoster(hosters, room.id in hot_room_ids).start_room(room.id)
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -141,15 +179,134 @@ def autohost(config: dict):
     Thread(target=keep_running, name="AP_Autohost").start()
 
 
+def generation_priority(player_count: int, waited: float) -> float:
+    """Generations with a lower priority value start first. Small generations go before large ones,
+    but every minute spent waiting makes a generation count as smaller, so large ones don't wait forever."""
+    return player_count / (1 + waited / 60)
+
+
+class GenerationQueue:
+    """Starts queued generations smallest first, keeping no more running than there are generator processes."""
+    running: typing.Dict[UUID, typing.Tuple[multiprocessing.pool.AsyncResult, float]]
+    """results and start times of running generations"""
+    durations: typing.Deque[float]
+    """seconds taken by recent successful generations"""
+    worker_pids: typing.Dict[UUID, int]
+    """process ids of the generator processes running generations, as reported through started_generations"""
+    terminated: typing.Set[UUID]
+    """running generations whose generator process was terminated for running well past their allowed time"""
+
+    def __init__(self, pool: multiprocessing.pool.Pool, generators: int, job_time: int | None,
+                 started_generations: multiprocessing.Queue | None = None):
+        self.pool = pool
+        self.generators = generators
+        self.job_time = job_time
+        self.started_generations = started_generations
+        self.running = {}
+        self.worker_pids = {}
+        self.terminated = set()
+        self.durations = collections.deque(maxlen=20)
+        self.player_counts: typing.Dict[UUID, int] = {}
+        self.queued_since: typing.Dict[UUID, float] = {}
+        self.last_position_update = 0.0
+
+    def launch(self, generation: Generation) -> None:
+        result = launch_generator(self.pool, generation, timeout=self.job_time)
+        if result:
+            self.running[generation.id] = result, time.monotonic()
+        self.player_counts.pop(generation.id, None)
+        self.queued_since.pop(generation.id, None)
+
+    def collect(self) -> None:
+        """Forget finished generations and ones whose generator process died.
+        Generator processes of generations well past their allowed time get terminated, to free up their generator."""
+        if self.started_generations:
+            try:
+                while True:
+                    generation_id, pid = self.started_generations.get_nowait()
+                    if generation_id in self.running:
+                        self.worker_pids[generation_id] = pid
+            except queue.Empty:
+                pass
+        # the pool replaces dead workers, but never completes the result of the job they were running
+        alive_pids = {process.pid for process in multiprocessing.active_children()} if self.worker_pids else set()
+        now = time.monotonic()
+        for generation_id, (result, start) in list(self.running.items()):
+            worker_died = generation_id in self.worker_pids and self.worker_pids[generation_id] not in alive_pids
+            if worker_died:
+                result.wait(1)  # a worker retiring after maxtasksperchild can exit before its result got handled
+            if result.ready():
+                del self.running[generation_id]
+                if result.successful():
+                    self.durations.append(now - start)
+            elif worker_died:
+                logging.warning(f"Generator process of {generation_id} died")
+                del self.running[generation_id]
+            elif self.job_time and now - start > 2 * self.job_time and generation_id not in self.terminated:
+                if generation_id in self.worker_pids:
+                    # the generator stays busy until its process is gone, which the pool then replaces
+                    logging.warning(f"Terminating generator process of {generation_id}, running past its time")
+                    try:
+                        os.kill(self.worker_pids[generation_id], signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass  # died in the meantime, which the next collect notices
+                    self.terminated.add(generation_id)
+                else:
+                    del self.running[generation_id]  # never reported starting, so no process works on it
+        for generation_id in self.worker_pids.keys() - self.running.keys():
+            del self.worker_pids[generation_id]
+        self.terminated &= self.running.keys()
+
+    def get_priority(self, generation: Generation, now: float) -> float:
+        if generation.id not in self.player_counts:
+            self.player_counts[generation.id] = len(restricted_loads(generation.options))
+        waited = now - self.queued_since.setdefault(generation.id, now)
+        return generation_priority(self.player_counts[generation.id], waited)
+
+    def update(self) -> None:
+        self.collect()
+        now = time.monotonic()
+        with db_session:
+            # for update locks the database row(s) during transaction, preventing writes from elsewhere
+            queued = sorted(select(generation for generation in Generation
+                                   if generation.state == STATE_QUEUED).for_update(),
+                            key=lambda generation: self.get_priority(generation, now))
+            free = max(0, self.generators - len(self.running))
+            for generation in queued[:free]:
+                self.launch(generation)
+            if now - self.last_position_update >= 1:
+                self.last_position_update = now
+                self.update_positions(queued[free:])
+
+    def update_positions(self, queued: typing.List[Generation]) -> None:
+        """Write the queue position and estimated start of waiting generations to their meta, for wait_seed."""
+        duration = sum(self.durations) / len(self.durations) if self.durations else None
+        for position, generation in enumerate(queued, 1):
+            meta = json.loads(generation.meta)
+            old_queue_meta = meta.get("queue", {})
+            # the eta only gets rewritten along with the position, so rows aren't written every second
+            if old_queue_meta.get("position") == position and ("eta" in old_queue_meta or duration is None):
+                continue
+            queue_meta = {"position": position}
+            if duration is not None:
+                # all generators are busy, this one starts after the ones ahead finish in rounds of one per generator
+                queue_meta["eta"] = int(time.time() + math.ceil(position / self.generators) * duration)
+            meta["queue"] = queue_meta
+            generation.meta = json.dumps(meta)
+
+
 def autogen(config: dict):
     def keep_running():
         stop_event = _stop_event
         try:
             with Locker("autogen"):
 
+                started_generations = multiprocessing.Queue()
                 with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
-                                          initargs=(config,), maxtasksperchild=10) as generator_pool:
-                    job_time = config["JOB_TIME"]
+                                          initargs=(config, started_generations),
+                                          maxtasksperchild=10) as generator_pool:
+                    generation_queue = GenerationQueue(generator_pool, config["GENERATORS"], config["JOB_TIME"],
+                                                       started_generations)
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
 
@@ -160,19 +317,13 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation, timeout=job_time)
+                                    generation_queue.launch(generation)
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
 
                     while not stop_event.wait(0.1):
-                        with db_session:
-                            # for update locks the database row(s) during transaction, preventing writes from elsewhere
-                            to_start = select(
-                                generation for generation in Generation
-                                if generation.state == STATE_QUEUED).for_update()
-                            for generation in to_start:
-                                launch_generator(generator_pool, generation, timeout=job_time)
+                        generation_queue.update()
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -180,6 +331,15 @@ def autogen(config: dict):
 
 
 class MultiworldInstance():
+    room_loads: typing.Dict[UUID, RoomLoad]
+    """latest load of each room hosted by this instance"""
+    hot_room_ids: typing.Set[UUID]
+    """rooms of this instance with a load above hot_room_load"""
+    memory: int
+    """latest resident memory of the process in bytes, 0 if unknown"""
+    memory_limit: int
+    """resident memory in bytes, above which new rooms go to other hosters if possible, 0 for no limit"""
+
     def __init__(self, config: dict, id: int):
         self.room_ids = set()
         self.process: typing.Optional[multiprocessing.Process] = None
@@ -187,10 +347,26 @@ class MultiworldInstance():
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.hot_room_load = config["HOT_ROOM_LOAD"]
+        self.memory_limit = config["HOSTER_MEMORY_LIMIT"]
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.room_load_reports = multiprocessing.Queue()
+        self.room_loads = {}
+        self.hot_room_ids = set()
+        self.memory = 0
         self.name = f"MultiHoster{id}"
 
+    @property
+    def over_memory_limit(self) -> bool:
+        return bool(self.memory_limit) and self.memory > self.memory_limit
+
+    @property
+    def load(self) -> float:
+        """Fraction of CPU time the process spends handling client messages of its rooms."""
+        unreported_rooms = len(self.room_ids) - len(self.room_loads)
+        return sum(room_load.busy for room_load in self.room_loads.values()) + unreported_rooms * new_room_load
+
     def start(self):
         if self.process and self.process.is_alive():
             return False
@@ -198,14 +374,27 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down,
+                                                self.room_load_reports),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def update(self):
+        """Collect rooms that shut down and the latest room loads reported by the process."""
         while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+            room_id = self.rooms_shutting_down.get(block=True, timeout=None)
+            self.room_ids.remove(room_id)
+            self.room_loads.pop(room_id, None)
+        while not self.room_load_reports.empty():
+            room_loads, self.memory = self.room_load_reports.get(block=True, timeout=None)
+            self.room_loads = {room_id: room_load for room_id, room_load in room_loads.items()
+                               if room_id in self.room_ids}
+        self.hot_room_ids = {room_id for room_id, room_load in self.room_loads.items()
+                             if room_load.busy >= self.hot_room_load}
+
+    def start_room(self, room_id):
+        self.update()
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
@@ -226,5 +415,5 @@ class MultiworldInstance():
 
 
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
+from .customserver import RoomLoad, run_server_process, get_static_server_data
 from .generate import gen_game
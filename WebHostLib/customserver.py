@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import asyncio
 import collections
+import contextlib
 import datetime
 import functools
 import logging
+import mmap
 import multiprocessing
 import pickle
 import random
@@ -63,17 +65,17 @@ class DBCommandProcessor(ServerCommandProcessor):
 class WebHostContext(Context):
     room_id: int
 
-    def __init__(self, static_server_data: dict, logger: logging.Logger):
-        # static server data is used during _load_game_data to load required data,
+    def __init__(self, static_server_data: StaticServerData, logger: logging.Logger):
+        # static server data is used during load to load the data of the room's games,
         # without needing to import worlds system, which takes quite a bit of memory
         self.static_server_data = static_server_data
         super(WebHostContext, self).__init__("", 0, "", "", 1,
                                              40, True, "enabled", "enabled",
                                              "enabled", 0, 2, logger=logger)
-        del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.db_command_processor = DBCommandProcessor(self)
 
     def __del__(self):
         try:
@@ -84,24 +86,15 @@ class WebHostContext(Context):
             self.logger.debug("Context destroyed")
 
     def _load_game_data(self):
-        for key, value in self.static_server_data.items():
-            # NOTE: attributes are mutable and shared, so they will have to be copied before being modified
-            setattr(self, key, value)
-        self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
+        pass  # only the games of the room get loaded, see load
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            del commands
-            time.sleep(5)
+    def _add_static_game(self, game: str) -> None:
+        # NOTE: values are mutable and shared, so they will have to be copied before being modified
+        game_data = self.static_server_data.get_game(game)
+        self.gamespackage[game] = game_data["gamespackage"]
+        self.item_name_groups[game] = game_data["item_name_groups"]
+        self.location_name_groups[game] = game_data["location_name_groups"]
+        self.non_hintable_names[game] = game_data["non_hintable_names"]
 
     @db_session
     def load(self, room_id: int):
@@ -115,39 +108,35 @@ class WebHostContext(Context):
         multidata = self.decompress(room.seed.multidata)
         game_data_packages = {}
 
-        static_gamespackage = self.gamespackage  # this is shared across all rooms
-        static_item_name_groups = self.item_name_groups
-        static_location_name_groups = self.location_name_groups
-        self.gamespackage = {"Archipelago": static_gamespackage.get("Archipelago", {})}  # this may be modified by _load
-        self.item_name_groups = {"Archipelago": static_item_name_groups.get("Archipelago", {})}
-        self.location_name_groups = {"Archipelago": static_location_name_groups.get("Archipelago", {})}
-        missing_checksum = False
+        # these are per room, but their values are shared across all rooms of the process and may be modified by _load
+        self.gamespackage = {}
+        self.item_name_groups = {}
+        self.location_name_groups = {}
+        self.non_hintable_names = collections.defaultdict(frozenset)
+        self._add_static_game("Archipelago")
+
+        if "datapackage" not in multidata:
+            # rolled before data packages were embedded, games are only known from the static data
+            for game in self.static_server_data.games:
+                self._add_static_game(game)
 
         for game in list(multidata.get("datapackage", {})):
             game_data = multidata["datapackage"][game]
             if "checksum" in game_data:
-                if static_gamespackage.get(game, {}).get("checksum") == game_data["checksum"]:
+                if self.static_server_data.get_game(game)["gamespackage"].get("checksum") == game_data["checksum"]:
                     # non-custom. remove from multidata and use static data
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = restricted_loads(row.data)
+                    custom_game_data = get_custom_game_data(game_data["checksum"])
+                    if custom_game_data:
+                        # shallow copy, as _load removes the groups from it
+                        game_data_packages[game] = dict(custom_game_data)
                         continue
                     else:
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
-            else:
-                missing_checksum = True  # Game rolled on old AP and will load data package from multidata
-            self.gamespackage[game] = static_gamespackage.get(game, {})
-            self.item_name_groups[game] = static_item_name_groups.get(game, {})
-            self.location_name_groups[game] = static_location_name_groups.get(game, {})
-
-        if not game_data_packages and not missing_checksum:
-            # all static -> use the static dicts directly
-            self.gamespackage = static_gamespackage
-            self.item_name_groups = static_item_name_groups
-            self.location_name_groups = static_location_name_groups
+            self._add_static_game(game)
+
         return self._load(multidata, game_data_packages, True)
 
     def init_save(self, enabled: bool = True):
@@ -158,7 +147,6 @@ class WebHostContext(Context):
                 if savegame_data:
                     self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
             self._start_async_saving(atexit_save=False)
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
@@ -180,33 +168,178 @@ def get_random_port():
     return random.randint(49152, 65535)
 
 
+def get_custom_game_data(checksum: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+    """Loads a game data package that is not part of the static data, shared by the rooms of this process."""
+    try:
+        return _load_custom_game_data(checksum)
+    except KeyError:  # rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
+        return None
+
+
+@functools.lru_cache(maxsize=64)
+def _load_custom_game_data(checksum: str) -> typing.Dict[str, typing.Any]:
+    # raises instead of returning None, so checksums that are not in the database yet don't get cached
+    row = GameDataPackage.get(checksum=checksum)
+    if not row:
+        raise KeyError(checksum)
+    return restricted_loads(row.data)
+
+
+class StaticServerData:
+    """
+    Data packages of all installed worlds, written once to a file that every room server process memory-maps.
+    The unpickled data is not shared: a process unpickles the games its rooms use into its own memory,
+    instead of receiving and holding every game's tables. Only the pickled records are shared through the file.
+    """
+    path: str
+    _index: typing.Optional[typing.Dict[str, typing.Tuple[int, int]]]
+    """game -> (offset, length) of its pickled data in the file"""
+    _map: typing.Optional[mmap.mmap]
+    _games: typing.Dict[str, typing.Dict[str, typing.Any]]
+
+    empty_game: typing.Dict[str, typing.Any] = {
+        "gamespackage": {},
+        "item_name_groups": {},
+        "location_name_groups": {},
+        "non_hintable_names": frozenset(),
+    }
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._index = None
+        self._map = None
+        self._games = {}
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        # only the path is sent to other processes, they map the file themselves
+        return self.__class__, (self.path,)
+
+    @classmethod
+    def write(cls, path: str, games: typing.Dict[str, typing.Dict[str, typing.Any]]) -> StaticServerData:
+        records = {game: pickle.dumps(game_data, pickle.HIGHEST_PROTOCOL) for game, game_data in games.items()}
+        index = {}
+        offset = 0
+        for game, record in records.items():
+            index[game] = offset, len(record)
+            offset += len(record)
+        encoded_index = pickle.dumps(index, pickle.HIGHEST_PROTOCOL)
+        with open(path, "wb") as f:
+            f.write(len(encoded_index).to_bytes(8, "little"))
+            f.write(encoded_index)
+            for record in records.values():
+                f.write(record)
+        return cls(path)
+
+    def _open(self) -> typing.Dict[str, typing.Tuple[int, int]]:
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index_length = int.from_bytes(self._map[:8], "little")
+        index = pickle.loads(self._map[8:8 + index_length])
+        data_start = 8 + index_length
+        self._index = {game: (data_start + offset, length) for game, (offset, length) in index.items()}
+        return self._index
+
+    @property
+    def games(self) -> typing.KeysView[str]:
+        return (self._index or self._open()).keys()
+
+    def get_game(self, game: str) -> typing.Dict[str, typing.Any]:
+        """Returns gamespackage, item_name_groups, location_name_groups and non_hintable_names of a game."""
+        game_data = self._games.get(game, None)
+        if game_data is None:
+            index = self._index or self._open()
+            if game not in index:
+                return self.empty_game
+            offset, length = index[game]
+            game_data = self._games[game] = pickle.loads(self._map[offset:offset + length])
+        return game_data
+
+
 @cache_argsless
-def get_static_server_data() -> dict:
+def get_static_server_data() -> StaticServerData:
+    import atexit
+    import os
+    import tempfile
     import worlds
-    data = {
-        "non_hintable_names": {
-            world_name: world.hint_blacklist
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-        "gamespackage": {
-            world_name: {
+
+    games = {
+        world_name: {
+            "gamespackage": {
                 key: value
-                for key, value in game_package.items()
+                for key, value in worlds.network_data_package["games"][world_name].items()
                 if key not in ("item_name_groups", "location_name_groups")
-            }
-            for world_name, game_package in worlds.network_data_package["games"].items()
-        },
-        "item_name_groups": {
-            world_name: world.item_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-        "location_name_groups": {
-            world_name: world.location_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
+            },
+            "item_name_groups": world.item_name_groups,
+            "location_name_groups": world.location_name_groups,
+            "non_hintable_names": world.hint_blacklist,
+        }
+        for world_name, world in worlds.AutoWorldRegister.world_types.items()
     }
 
-    return data
+    file_descriptor, path = tempfile.mkstemp(prefix="ap_static_server_data_")
+    os.close(file_descriptor)
+
+    def remove_file() -> None:
+        # processes that still have the file mapped keep their view of it
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+    atexit.register(remove_file)
+    return StaticServerData.write(path, games)
+
+
+class RoomLoad(typing.NamedTuple):
+    """Load a room put on its server process since the previous report."""
+    messages: float
+    """client messages handled per second"""
+    busy: float
+    """fraction of CPU time spent handling client messages"""
+
+
+room_load_interval = 10  # seconds between reports of room loads to the autolauncher
+db_command_interval = 1  # seconds between checks for commands sent to the rooms of a process
+
+
+async def copy_rooms(rooms: typing.Dict[typing.Any, WebHostContext]) -> typing.Dict[typing.Any, WebHostContext]:
+    return dict(rooms)
+
+
+def dispatch_db_commands(rooms: typing.Dict[typing.Any, WebHostContext], loop: asyncio.AbstractEventLoop):
+    """Hands commands sent from the website to the rooms of this process, with one query for all of them.
+    Commands for rooms that are not running stay in the database until the room runs again."""
+    # rooms is changed by the loop as rooms start and stop, so it is only read there
+    running_rooms = asyncio.run_coroutine_threadsafe(copy_rooms(rooms), loop).result()
+    if not running_rooms:
+        return
+    room_ids = list(running_rooms)
+    with db_session:
+        commands = select(command for command in Command if command.room.id in room_ids)
+        for command in commands:
+            ctx = running_rooms.get(command.room.id, None)
+            if ctx:
+                loop.call_soon_threadsafe(ctx.db_command_processor, command.commandtext)
+                command.delete()
+        commit()
+    del commands
+
+
+def keep_dispatching_db_commands(rooms: typing.Dict[typing.Any, WebHostContext], loop: asyncio.AbstractEventLoop):
+    while True:
+        time.sleep(db_command_interval)
+        try:
+            dispatch_db_commands(rooms, loop)
+        except Exception:
+            # this is the only thread delivering commands to the rooms of this process, so it has to keep going
+            logging.exception("Failed to dispatch commands to rooms.")
+
+
+def get_memory_usage() -> int:
+    """Returns the resident memory of this process in bytes, 0 if psutil is not available."""
+    try:
+        import psutil
+    except ImportError:
+        return 0
+    return psutil.Process().memory_info().rss
 
 
 def set_up_logging(room_id) -> logging.Logger:
@@ -229,9 +362,10 @@ def set_up_logging(room_id) -> logging.Logger:
     return logger
 
 
-def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
+def run_server_process(name: str, ponyconfig: dict, static_server_data: StaticServerData,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       room_loads: typing.Optional[multiprocessing.Queue] = None):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -275,6 +409,35 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    rooms: typing.Dict[typing.Any, WebHostContext] = {}  # running rooms by id
+
+    async def report_room_loads():
+        previous: typing.Dict[typing.Any, typing.Tuple[int, float]] = {}
+        last_report = time.monotonic()
+        last_cpu_time = time.thread_time()  # of the event loop's thread, which handles the messages of all rooms
+        while True:
+            await asyncio.sleep(room_load_interval)
+            now = time.monotonic()
+            elapsed = now - last_report
+            last_report = now
+            cpu_time = time.thread_time()
+            loop_cpu_time = cpu_time - last_cpu_time
+            last_cpu_time = cpu_time
+            current: typing.Dict[typing.Any, typing.Tuple[int, float]] = {}
+            handling_times: typing.Dict[typing.Any, float] = {}
+            for room_id, ctx in rooms.items():
+                current[room_id] = ctx.handled_messages, ctx.handling_time
+                handling_times[room_id] = ctx.handling_time - previous.get(room_id, (0, 0.0))[1]
+            # a room waiting on a slow client also counts the CPU time other rooms used meanwhile,
+            # so the rooms are scaled down to the time the loop actually used, if they add up to more
+            total_handling_time = sum(handling_times.values())
+            scale = min(1.0, loop_cpu_time / total_handling_time) if total_handling_time else 1.0
+            loads: typing.Dict[typing.Any, RoomLoad] = {}
+            for room_id, (handled_messages, _) in current.items():
+                loads[room_id] = RoomLoad((handled_messages - previous.get(room_id, (0, 0.0))[0]) / elapsed,
+                                          handling_times[room_id] * scale / elapsed)
+            previous = current
+            room_loads.put((loads, get_memory_usage()))
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -283,6 +446,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
                 ctx.init_save()
+                rooms[room_id] = ctx
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -351,6 +515,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     del room
                     logging.info(f"Shutting down room {room_id} on {name}.")
                 finally:
+                    rooms.pop(room_id, None)
                     await asyncio.sleep(5)
                     rooms_shutting_down.put(room_id)
 
@@ -378,9 +543,15 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     starter = Starter()
     starter.daemon = True
     starter.start()
+    threading.Thread(target=keep_dispatching_db_commands, args=(rooms, loop), name="DBCommandDispatcher",
+                     daemon=True).start()
+    # the loop only keeps a weak reference to tasks
+    load_reporter = loop.create_task(report_room_loads()) if room_loads else None
     try:
         loop.run_forever()
     finally:
+        if load_reporter:
+            load_reporter.cancel()
         # save all tasks that want to be saved during shutdown
         for task in asyncio.all_tasks(loop):
             save: typing.Optional[typing.Callable[[], typing.Any]] = getattr(task, "save", None)
@@ -1,8 +1,11 @@
 import concurrent.futures
+import ctypes
 import json
 import os
 import random
+import signal
 import tempfile
+import threading
 import zipfile
 from collections import Counter
 from pickle import PicklingError
@@ -118,6 +121,51 @@ def start_generation(options: dict[str, dict | str], meta: dict[str, Any]):
         return redirect(url_for("view_seed", seed=seed_id))
 
 
+class GenerationTimeout(BaseException):
+    """Interrupts a generation that exceeded its time, a BaseException so worlds' error handling doesn't catch it."""
+
+
+def _interrupt_thread(thread: threading.Thread) -> None:
+    """Raises GenerationTimeout in thread, once it runs Python code again."""
+    if thread.ident is not None and thread.is_alive():
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread.ident), ctypes.py_object(GenerationTimeout))
+
+
+def run_with_timeout(task, timeout: int | None):
+    """Runs task, raising concurrent.futures.TimeoutError once timeout seconds have passed.
+    In the main thread, such as in a generator process, the task and the threads it started get interrupted, the task
+    with an alarm signal. Elsewhere, or where there are no alarm signals, the task is left to finish in a daemon thread."""
+    if timeout and threading.current_thread() is threading.main_thread() and hasattr(signal, "setitimer"):
+        threads_before = set(threading.enumerate())
+
+        def interrupt(signum, frame):
+            # threads of the task, like Main's output threads, would keep running and the task would wait for them
+            for thread in threading.enumerate():
+                if thread not in threads_before:
+                    _interrupt_thread(thread)
+            raise GenerationTimeout()
+
+        previous_handler = signal.signal(signal.SIGALRM, interrupt)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return task()
+        except GenerationTimeout:
+            raise concurrent.futures.TimeoutError() from None
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    thread_pool = DaemonThreadPoolExecutor(max_workers=1)
+    thread = thread_pool.submit(task)
+    try:
+        return thread.result(timeout)
+    finally:
+        # free resources claimed by thread pool, if possible
+        # NOTE: Timeout depends on the process being killed at some point
+        #       since we can't actually cancel a running gen in a thread.
+        thread_pool.shutdown(wait=False, cancel_futures=True)
+
+
 def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None, sid=None, timeout: int|None = None):
     if meta is None:
         meta = {}
@@ -151,7 +199,9 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
         args.skip_prog_balancing = False
         args.skip_output = False
         args.spoiler_only = False
+        args.spoiler_json = False
         args.csv_output = False
+        args.profile = 0
         args.sprite = dict.fromkeys(range(1, args.multi+1), None)
         args.sprite_pool = dict.fromkeys(range(1, args.multi+1), None)
 
@@ -173,11 +223,8 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
 
         return upload_to_db(target.name, sid, owner, race)
 
-    thread_pool = DaemonThreadPoolExecutor(max_workers=1)
-    thread = thread_pool.submit(task)
-
     try:
-        return thread.result(timeout)
+        return run_with_timeout(task, timeout)
     except concurrent.futures.TimeoutError as e:
         if sid:
             with db_session:
@@ -204,11 +251,6 @@ def gen_game(gen_options: dict, meta: dict[str, Any] | None = None, owner=None,
                     gen.meta = json.dumps(meta)
                     commit()
         raise
-    finally:
-        # free resources claimed by thread pool, if possible
-        # NOTE: Timeout depends on the process being killed at some point
-        #       since we can't actually cancel a running gen at the moment.
-        thread_pool.shutdown(wait=False, cancel_futures=True)
 
 
 @app.route('/wait/<suuid:seed>')
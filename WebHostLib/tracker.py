@@ -1,7 +1,9 @@
 import datetime
 import collections
+import hashlib
+import threading
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple, NamedTuple, Counter, TypeVar
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
@@ -22,6 +24,56 @@ _player_trackers: Dict[str, Callable] = {}
 
 TeamPlayer = Tuple[int, int]
 ItemMetadata = Tuple[int, int, int]
+T = TypeVar("T")
+
+
+class _ProcessCache:
+    """Keeps the most recently used decoded data of this process, so tracker requests don't decode it every time."""
+    def __init__(self, size: int):
+        self._size = size
+        self._entries: "collections.OrderedDict[Hashable, Tuple[Hashable, Any]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable, load: Callable[[], T]) -> T:
+        """Returns the cached value for key, calling load if there is none or it was cached for a different version."""
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = load()
+        with self._lock:
+            self._entries[key] = version, value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+        return value
+
+
+# multidata never changes for a seed, multisave changes with last_activity and data packages with their checksum
+_multidata_cache = _ProcessCache(32)
+_multisave_cache = _ProcessCache(64)
+_game_package_cache = _ProcessCache(256)
+
+
+class _GamePackageTables(NamedTuple):
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+    @classmethod
+    def load(cls, checksum: str) -> "_GamePackageTables":
+        game_package = restricted_loads(GameDataPackage.get(checksum=checksum).data)
+        return cls(
+            KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+                id: name for name, id in game_package["item_name_to_id"].items()}),
+            KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+                id: name for name, id in game_package["location_name_to_id"].items()}),
+            game_package["item_name_to_id"],
+            game_package["location_name_to_id"],
+        )
 
 
 def _cache_results(func: Callable) -> Callable:
@@ -46,6 +98,7 @@ class TrackerData:
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    Decoded multidata, multisave and data packages are shared between instances and must not be modified.
     """
     room: Room
     _multidata: Dict[str, Any]
@@ -55,8 +108,13 @@ class TrackerData:
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multidata = _multidata_cache.get(room.seed.id, None, lambda: Context.decompress(room.seed.multidata))
+        # not every save of the room server updates last_activity, so the cached multisave is checked against a
+        # digest of the saved bytes, which is much cheaper than unpickling them again
+        multisave = room.multisave
+        self._multisave = _multisave_cache.get(
+            room.id, hashlib.blake2b(multisave).digest() if multisave else None,
+            lambda: restricted_loads(multisave) if multisave else {})
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -70,15 +128,14 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            checksum = game_package["checksum"]
+            tables = _game_package_cache.get(checksum, None, lambda: _GamePackageTables.load(checksum))
+            self.item_id_to_name[game] = tables.item_id_to_name
+            self.location_id_to_name[game] = tables.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = tables.item_name_to_id
+            self.location_name_to_id[game] = tables.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -3,7 +3,6 @@ import pickle
 import typing
 import uuid
 import zipfile
-import zlib
 
 from io import BytesIO
 from flask import request, flash, redirect, url_for, session, render_template, abort
@@ -13,8 +12,9 @@ from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
-from NetUtils import GamesPackage, SlotType
-from Utils import VersionException, __version__
+from NetUtils import GamesPackage, SectionedMultiData, SlotType, dump_sectioned_multidata
+from settings import get_settings
+from Utils import VersionException, ZlibWriter, __version__
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
 from . import app
@@ -52,6 +52,7 @@ def process_multidata(compressed_multidata, files={}):
     decompressed_multidata = MultiServer.Context.decompress(compressed_multidata)
 
     slots: typing.Set[Slot] = set()
+    stripped = False
     if "datapackage" in decompressed_multidata:
         # strip datapackage from multidata, leaving only the checksums
         game_data_packages: typing.List[GameDataPackage] = []
@@ -72,6 +73,7 @@ def process_multidata(compressed_multidata, files={}):
                     "version": game_data.get("version", 0),
                     "checksum": game_data["checksum"],
                 }
+                stripped = True
                 try:
                     commit()  # commit game data package
                     game_data_packages.append(game_data_package)
@@ -90,7 +92,18 @@ def process_multidata(compressed_multidata, files={}):
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    if stripped:
+        stripped_multidata = BytesIO()
+        compression_level = get_settings().generator.multidata_compression_level
+        if isinstance(decompressed_multidata, SectionedMultiData):
+            # only the data package and slot info were decompressed, everything else is copied as it is
+            dump_sectioned_multidata(decompressed_multidata, stripped_multidata, compression_level)
+        else:
+            # decompressed_multidata came from restricted_loads, so it does not have to be checked again
+            stripped_multidata.write(compressed_multidata[0:1])
+            with ZlibWriter(stripped_multidata, compression_level) as compressed:
+                pickle.dump(decompressed_multidata, compressed)
+        compressed_multidata = stripped_multidata.getvalue()
     return slots, compressed_multidata
 
 
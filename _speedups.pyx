@@ -14,6 +14,7 @@ from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
+from libc.stdlib cimport qsort
 from collections import defaultdict
 
 cdef extern from *:
@@ -69,6 +70,21 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef int _compare_by_receiver(const void* a, const void* b) noexcept nogil:
+    # orders entries by receiver and item, then by sender and location like the entries themselves
+    cdef LocationEntry* x = (<LocationEntry**>a)[0]
+    cdef LocationEntry* y = (<LocationEntry**>b)[0]
+    if x.receiver != y.receiver:
+        return -1 if x.receiver < y.receiver else 1
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    if x.sender != y.sender:
+        return -1 if x.sender < y.sender else 1
+    if x.location != y.location:
+        return -1 if x.location < y.location else 1
+    return 0
+
+
 if TYPE_CHECKING:
     State = Dict[Tuple[int, int], Set[int]]
 else:
@@ -92,6 +108,9 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef LocationEntry** receiver_entries  # 800KB/100k items, entries sorted by receiver and item
+    cdef IndexEntry* receiver_index  # 16KB/1000 players, range of receiver_entries per receiver
+    cdef size_t receiver_index_size
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -100,7 +119,8 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size \
+                + sizeof(LocationEntry*) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -117,6 +137,7 @@ cdef class LocationStore:
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
+        cdef size_t max_receiver = 0
         cdef size_t sender_count = 0
         cdef size_t count = 0
         for sender, locations in locations_dict.items():
@@ -131,6 +152,7 @@ cdef class LocationStore:
                 receiver = data[1]
                 if receiver < 1 or receiver > MAX_PLAYER_ID:
                     raise ValueError(f"Invalid player id {receiver} for item")
+                max_receiver = max(max_receiver, receiver)
                 count += 1
             sender_count += 1
 
@@ -150,10 +172,15 @@ cdef class LocationStore:
             self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
         self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
         self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
+        if count:
+            self.receiver_entries = <LocationEntry**>self._mem.alloc(count, sizeof(LocationEntry*))
+        self.receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
 
         assert (not self.entries) == (not count)
+        assert (not self.receiver_entries) == (not count)
         assert self.sender_index
         assert self._raw_proxies
+        assert self.receiver_index
 
         # build entries and index
         cdef size_t i = 0
@@ -172,6 +199,18 @@ cdef class LocationStore:
                 self.sender_index[sender].count += 1
                 i += 1
 
+        # build reverse index, so lookups by receiver only have to look at matching entries
+        for i in range(count):
+            self.receiver_entries[i] = self.entries + i
+        if count:
+            qsort(self.receiver_entries, count, sizeof(LocationEntry*), _compare_by_receiver)
+        cdef ap_player_t indexed_receiver
+        for i in range(count):
+            indexed_receiver = self.receiver_entries[i].receiver
+            if not self.receiver_index[indexed_receiver].count:
+                self.receiver_index[indexed_receiver].start = i
+            self.receiver_index[indexed_receiver].count += 1
+
         # build pyobject caches
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
@@ -187,6 +226,7 @@ cdef class LocationStore:
             self._raw_proxies[i] = <PyObject*>proxy
 
         self.sender_index_size = max_sender + 1
+        self.receiver_index_size = max_receiver + 1
         self.entry_count = count
         self._len = sender_count
 
@@ -217,45 +257,44 @@ cdef class LocationStore:
     # specialized accessors
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
-        cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef LocationEntry* entry
+        cdef size_t start
+        cdef size_t end
+        cdef size_t mid
+        for slot in slots:
+            if slot < 1 or slot >= self.receiver_index_size:
+                continue
+            start = self.receiver_index[slot].start
+            end = start + self.receiver_index[slot].count
+            # binary search for the first entry of item, entries of a receiver are sorted by item
+            while start < end:
+                mid = (start + end) // 2
+                if self.receiver_entries[mid].item < item:
+                    start = mid + 1
+                else:
+                    end = mid
+            end = self.receiver_index[slot].start + self.receiver_index[slot].count
+            while start < end:
+                entry = self.receiver_entries[start]
+                if entry.item != item:
+                    break
+                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+                start += 1
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
+        cdef LocationEntry* entry
+        cdef size_t i
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        if slot < 1 or slot >= self.receiver_index_size:
+            return all_locations
+        cdef size_t start = self.receiver_index[slot].start
+        cdef size_t count = self.receiver_index[slot].count
+        for i in range(start, start + count):
+            entry = self.receiver_entries[i]
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
         return all_locations
 
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
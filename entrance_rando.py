@@ -5,7 +5,7 @@ import time
 from collections import deque
 from collections.abc import Callable, Iterable
 
-from BaseClasses import CollectionState, Entrance, Region, EntranceType
+from BaseClasses import CollectionState, Entrance, Location, Region, EntranceType
 from Options import Accessibility
 from worlds.AutoWorld import World
 
@@ -181,6 +181,9 @@ class ERPlacementState:
     coupled: bool
     """Whether entrance randomization is operating in coupled mode"""
 
+    sweep_locations: list[Location]
+    """The locations that contain advancement items, to sweep through after each connection"""
+
     def __init__(self, world: World, entrance_lookup: EntranceLookup, coupled: bool):
         self.placements = []
         self.pairings = []
@@ -188,6 +191,17 @@ class ERPlacementState:
         self.coupled = coupled
         self.collection_state = world.multiworld.get_all_state(False, True)
         self.entrance_lookup = entrance_lookup
+        self.update_sweep_locations()
+
+    def update_sweep_locations(self) -> None:
+        """Finds the locations with advancement items again, needed if items were placed since."""
+        self.sweep_locations = [location for location in self.world.multiworld.get_locations()
+                                if location.advancement and location not in self.collection_state.advancements]
+
+    def sweep(self, state: CollectionState | None = None) -> None:
+        """Sweeps state, defaulting to collection_state, for the advancement items that became reachable."""
+        state = state or self.collection_state
+        state.sweep_for_advancements(locations=self.sweep_locations)
 
     @property
     def placed_regions(self) -> set[Region]:
@@ -212,21 +226,32 @@ class ERPlacementState:
         target_region.entrances.remove(target_entrance)
         source_exit.connect(target_region)
 
-        self.collection_state.stale[self.world.player] = True
+        # nothing else changed in the region graph, so only the new connection needs to be checked
+        self.collection_state.recheck_connections(self.world.player, (source_exit,))
         self.placements.append(source_exit)
         self.pairings.append((source_exit.name, target_entrance.name))
         self.entrance_lookup.remove(target_entrance)
 
     def test_speculative_connection(self, source_exit: Entrance, target_entrance: Entrance,
                                     usable_exits: set[Entrance]) -> bool:
+        # the copy shares its per-player structures with collection_state until they are changed,
+        # so only this world's reachability gets copied
         copied_state = self.collection_state.copy()
         # simulated connection. A real connection is unsafe because the region graph is shallow-copied and would
         # propagate back to the real multiworld.
-        copied_state.reachable_regions[self.world.player].add(target_entrance.connected_region)
+        target_region = target_entrance.connected_region
+        copied_state.reachable_regions[self.world.player].add(target_region)
         copied_state.blocked_connections[self.world.player].remove(source_exit)
-        copied_state.blocked_connections[self.world.player].update(target_entrance.connected_region.exits)
+        copied_state.blocked_connections[self.world.player].update(target_region.exits)
+        if self.world.explicit_indirect_conditions:
+            # only what the target region leads to or unblocks can have changed
+            copied_state.recheck_connections(self.world.player, itertools.chain(
+                target_region.exits, self.world.multiworld.indirect_connections.get(target_region, ())))
+        else:
+            # any blocked connection could depend on reaching the target region
+            copied_state.invalidate_reachable_regions(self.world.player)
         copied_state.update_reachable_regions(self.world.player)
-        copied_state.sweep_for_advancements()
+        self.sweep(copied_state)
         # test that at there are newly reachable randomized exits that are ACTUALLY reachable
         available_randomized_exits = copied_state.blocked_connections[self.world.player]
         for _exit in available_randomized_exits:
@@ -402,12 +427,14 @@ def randomize_entrances(
         placed_exits, paired_entrances = er_state.connect(source_exit, target_entrance)
         # propagate new connections
         er_state.collection_state.update_reachable_regions(world.player)
-        er_state.collection_state.sweep_for_advancements()
+        er_state.sweep()
         if on_connect:
             change = on_connect(er_state, placed_exits, paired_entrances)
             if change:
+                er_state.collection_state.invalidate_reachable_regions(world.player)
                 er_state.collection_state.update_reachable_regions(world.player)
-                er_state.collection_state.sweep_for_advancements()
+                er_state.update_sweep_locations()
+                er_state.sweep()
 
     def needs_speculative_sweep(dead_end: bool, require_new_exits: bool, placeable_exits: list[Entrance]) -> bool:
         # speculative sweep is expensive. We currently only do it as a last resort, if we might cap off the graph
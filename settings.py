@@ -609,6 +609,12 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class DataStorageMaxValueSize(int):
+        """
+        Largest size in bytes a single data storage value may grow to through Set, approximated with pickle.
+        Set packages that would exceed it are rejected. 0 for no limit
+        """
+
     host: str | None = None
     port: int = 38281
     password: str | None = None
@@ -628,6 +634,7 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    data_storage_max_value_size: DataStorageMaxValueSize = DataStorageMaxValueSize(0)
 
 
 class GeneratorOptions(Group):
@@ -687,6 +694,25 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class WorldStageThreads(int):
+        """
+        Number of threads used to run the per-world generation steps up to generate_basic for multiple worlds at once.
+        Only worlds that declare these steps safe to run concurrently take part.
+        0 or 1 runs them one world at a time. Each world has its own random, so the result does not depend on this.
+        """
+
+    class MultidataCompressionLevel(int):
+        """
+        zlib compression level from 0 to 9 of the .archipelago file, also used by WebHost when storing uploads.
+        Lower levels compress large multiworlds a lot faster, at the cost of a bigger file.
+        """
+
+    class SectionedMultidata(Bool):
+        """
+        Write the .archipelago file in format version 4, which servers can load section by section as needed.
+        Servers and tools that predate format version 4 can't load these files.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -696,6 +722,9 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    world_stage_threads: WorldStageThreads = WorldStageThreads(0)
+    multidata_compression_level: MultidataCompressionLevel = MultidataCompressionLevel(9)
+    sectioned_multidata: SectionedMultidata | bool = False
     loglevel: str = "info"
     logtime: bool = False
 
@@ -271,6 +271,28 @@ class TestDisconnectForRandomization(unittest.TestCase):
         self.assertEqual(2, r2.entrances[0].randomization_group)
 
 
+class TestSpeculativeConnection(unittest.TestCase):
+    def test_auto_indirect_conditions(self):
+        """tests that connections depending on the target region are rechecked without explicit indirect conditions"""
+        multiworld = generate_test_multiworld()
+        world = multiworld.worlds[1]
+        world.explicit_indirect_conditions = False
+        menu = multiworld.get_region("Menu", 1)
+        generate_entrance_pair(menu, "_right", ERTestGroups.RIGHT)
+        end = Region("End", 1, multiworld)
+        gated = Region("Gated", 1, multiworld)
+        multiworld.regions += [end, gated]
+        generate_entrance_pair(end, "_left", ERTestGroups.LEFT)
+        generate_entrance_pair(gated, "_right", ERTestGroups.RIGHT)
+        menu.connect(gated, rule=lambda state: state.can_reach_region("End", 1))
+
+        usable_exits = {menu.exits[0], gated.exits[0]}
+        er_state = ERPlacementState(world, EntranceLookup(world.random, False, usable_exits, []), False)
+        er_state.collection_state.update_reachable_regions(1)
+        self.assertNotIn(gated, er_state.placed_regions)
+        self.assertTrue(er_state.test_speculative_connection(menu.exits[0], end.entrances[0], usable_exits))
+
+
 class TestRandomizeEntrances(unittest.TestCase):
     def test_determinism(self):
         """tests that the same output is produced for the same input"""
@@ -2,11 +2,12 @@ from typing import List, Iterable
 import unittest
 
 from Options import Accessibility
-from test.general import generate_items, generate_locations, generate_test_multiworld
-from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+from test.general import generate_items, generate_locations, generate_test_multiworld, setup_multiworld
+from Fill import FillError, PlacementIndex, PoolSweepCheckpoints, balance_multiworld_progression, fill_restrictive, \
+    distribute_early_items, distribute_items_restrictive, sweep_from_pool
+from BaseClasses import CollectionState, Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
+from worlds.AutoWorld import AutoWorldRegister
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
 
@@ -464,6 +465,84 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
 
+class TestPlacementIndex(unittest.TestCase):
+    def test_same_as_scan(self) -> None:
+        """Test that the index finds the same locations as checking the locations in order"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 60, 0, 40)
+        player2 = generate_player_data(multiworld, 2, 0, 0, 40)
+        locality_rules(multiworld)
+        only_own = lambda item: item.player == 1
+        for location in player1.locations[::3]:
+            location.item_rule = only_own
+        for location in player1.locations[1::7]:
+            add_item_rule(location, lambda item, name=location.name: item.name != name)
+        reachable = set(player1.locations[::2])
+        items = player1.basic_items + player2.basic_items
+        multiworld.random.shuffle(items)
+
+        locations = player1.locations.copy()
+        index = PlacementIndex(locations)
+        expected_locations = player1.locations.copy()
+        for item in items:
+            def can_fill(location: Location, check_access: bool = True) -> bool:
+                return location.item_rule(item) and (not check_access or location in reachable)
+
+            expected = next((location for location in expected_locations if can_fill(location)), None)
+            found = index.find(can_fill, lambda location: can_fill(location, False))
+            self.assertIs(found, expected)
+            if found:
+                index.take(found)
+                expected_locations.remove(found)
+            self.assertEqual(locations, expected_locations)
+
+
+class TestPoolSweepCheckpoints(unittest.TestCase):
+    def test_same_as_sweep_from_pool(self) -> None:
+        """Test that sweeping from checkpoints gives the same state as sweeping from the base state"""
+        world_types = [AutoWorldRegister.world_types[game] for game in ("APQuest", "Timespinner")]
+        for seed in range(16):
+            with self.subTest(seed=seed):
+                multiworld = setup_multiworld(world_types, seed=seed)
+                distribute_items_restrictive(multiworld)
+                # take the progression back out of a finished fill, in playthrough order. Each item's location is
+                # reachable with the items before it, so it stays reachable while the pool only holds items before it
+                item_pool: List[Item] = []
+                for sphere in multiworld.get_spheres():
+                    if not sphere:
+                        break
+                    sphere_items = [location.item for location in sorted(sphere)
+                                    if location.item and location.item.advancement and location.address is not None]
+                    multiworld.random.shuffle(sphere_items)
+                    item_pool += sphere_items
+                # items compare by name, so identical items are told apart by id
+                item_locations = {id(item): item.location for item in item_pool}
+                for item in item_pool:
+                    item_locations[id(item)].item = item.location = None
+
+                base_state = CollectionState(multiworld)
+                pool_sweeps = PoolSweepCheckpoints(base_state, item_pool)
+                pool_sweeps.min_checkpoint_items = 2
+                used_checkpoints = False
+                while item_pool:
+                    # mostly take from the end like fill_restrictive, sometimes from the start
+                    index = 0 if len(item_pool) % 5 == 0 else len(item_pool) - 1
+                    item = item_pool.pop(index)
+                    pool_sweeps.removed(index)
+                    state = pool_sweeps.sweep()
+                    used_checkpoints |= bool(pool_sweeps.checkpoints)
+                    location = item_locations[id(item)]
+                    self.assertTrue(location.can_reach(state))
+                    multiworld.push_item(location, item, False)
+
+                    state = pool_sweeps.sweep()
+                    expected = sweep_from_pool(base_state, item_pool)
+                    for player in multiworld.player_ids:
+                        self.assertEqual(+state.prog_items[player], +expected.prog_items[player])
+                    self.assertEqual(state.advancements, expected.advancements)
+                self.assertTrue(used_checkpoints)
+
+
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
         """Test that distribute_items_restrictive is deterministic"""
@@ -0,0 +1,37 @@
+import itertools
+import json
+import unittest
+
+from BaseClasses import CollectionState
+from Utils import GenerationProfile
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import gen_steps, setup_multiworld
+
+
+class TestGenerationProfile(unittest.TestCase):
+    def test_report(self) -> None:
+        """Tests that world methods and access rules are recorded without changing the rules' results."""
+        world_types = [AutoWorldRegister.world_types[game] for game in ("APQuest", "Timespinner")]
+        multiworld = setup_multiworld(world_types, ())
+        multiworld.profile = GenerationProfile()
+        for step in gen_steps:
+            call_all(multiworld, step)
+
+        state = CollectionState(multiworld)
+        spots = list(itertools.chain(multiworld.get_locations(), multiworld.get_entrances()))
+        expected = [spot.can_reach(state) for spot in spots]
+        multiworld.profile.time_rules(spots)
+        state = CollectionState(multiworld)
+        self.assertEqual(expected, [spot.can_reach(state) for spot in spots])
+
+        with multiworld.profile.section("test"):
+            pass
+        report = json.loads(json.dumps(multiworld.profile.to_dict(multiworld.player_name, multiworld.game, 3)))
+        self.assertEqual(report["sections"]["test"]["calls"], 1)
+        self.assertEqual({world["player"] for world in report["worlds"]}, {1, 2})
+        for world in report["worlds"]:
+            self.assertIn("create_regions", world["methods"])
+        self.assertEqual(set(report["games"]), {"APQuest", "Timespinner"})
+        self.assertLessEqual(len(report["access_rules"]), 3)
+        self.assertTrue(report["access_rules"])
+        self.assertGreater(report["access_rules"][0]["calls"], 0)
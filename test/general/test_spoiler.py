@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import unittest
+
+from BaseClasses import CollectionState, Spoiler
+from Fill import distribute_items_restrictive
+from worlds.AutoWorld import AutoWorldRegister
+from . import setup_multiworld
+
+
+class TestSpoiler(unittest.TestCase):
+    def setUp(self) -> None:
+        world_types = [AutoWorldRegister.world_types[game] for game in ("APQuest", "Timespinner")]
+        self.multiworld = setup_multiworld(world_types)
+        distribute_items_restrictive(self.multiworld)
+
+    def test_sphere_state_cache(self) -> None:
+        """Tests that states recollected from checkpoints match the states collected sphere by sphere."""
+        spheres = [sphere for sphere in self.multiworld.get_spheres() if sphere]
+        cache = Spoiler._SphereStateCache(self.multiworld, spheres)
+        state = CollectionState(self.multiworld)
+        expected = [None]
+        for sphere in spheres[:-1]:
+            for location in sphere:
+                state.collect(location.item, True, location)
+            expected.append(state.copy())
+        for num in reversed(range(len(spheres))):
+            cached = cache.get(num)
+            if num:
+                for player in self.multiworld.player_ids:
+                    self.assertEqual(+cached.prog_items[player], +expected[num].prog_items[player], f"Sphere {num}")
+            else:
+                self.assertIsNone(cached)
+
+    def test_json_file(self) -> None:
+        spoiler = self.multiworld.spoiler
+        spoiler.create_playthrough()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            spoiler.to_file(os.path.join(temp_dir, "Spoiler.txt"))
+            with open(os.path.join(temp_dir, "Spoiler.txt"), encoding="utf-8-sig") as text_file:
+                self.assertIn("Playthrough:", text_file.read())
+
+            spoiler.to_json_file(os.path.join(temp_dir, "Spoiler.json"))
+            with open(os.path.join(temp_dir, "Spoiler.json"), encoding="utf-8") as json_file:
+                data = json.load(json_file)
+        self.assertEqual(data["playthrough"], spoiler.playthrough)
+        self.assertEqual(set(data["players"]), {"1", "2"})
+        locations = {(location, player): (item, item_player)
+                     for location, player, item, item_player in data["locations"]}
+        for location in self.multiworld.get_locations():
+            if location.show_in_spoiler:
+                self.assertEqual(locations[location.name, location.player], (location.item.name, location.item.player))
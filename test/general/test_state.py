@@ -1,7 +1,8 @@
 import unittest
 
+from BaseClasses import CollectionState, Entrance, Item, ItemClassification, Region, SphereIndex
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_locations, generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +28,164 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestItemConditions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.menu = self.multiworld.get_region("Menu", 1)
+        self.regions = [Region(f"Region {i}", 1, self.multiworld) for i in range(3)]
+        self.multiworld.regions += self.regions
+        self.key_entrance = self.menu.connect(self.regions[0], "Key Door",
+                                              lambda state: state.has("Key", 1))
+        self.other_entrance = self.menu.connect(self.regions[1], "Other Door",
+                                                lambda state: state.has("Other", 1))
+        self.multiworld.register_item_condition(self.key_entrance, ["Key"])
+
+    def test_declared_entrance_only_rechecked_for_its_items(self) -> None:
+        """Ensure declared entrances are skipped when unrelated items are collected."""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.regions[0].can_reach(state))
+        checked = []
+        self.key_entrance.access_rule = lambda state: checked.append(True) or state.has("Key", 1)
+        state.collect(Item("Other", ItemClassification.progression, None, 1))
+        self.assertTrue(self.regions[1].can_reach(state))
+        self.assertFalse(checked)
+        state.collect(Item("Key", ItemClassification.progression, None, 1))
+        self.assertTrue(self.regions[0].can_reach(state))
+        self.assertTrue(checked)
+
+    def test_indirect_condition_of_declared_entrance(self) -> None:
+        """Ensure declared entrances are still rechecked through their indirect conditions."""
+        gated_entrance = self.menu.connect(self.regions[2], "Gated Door",
+                                           lambda state: state.can_reach_region("Region 1", 1))
+        self.multiworld.register_item_condition(gated_entrance, ())
+        self.multiworld.register_indirect_condition(self.regions[1], gated_entrance)
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.regions[2].can_reach(state))
+        state.collect(Item("Other", ItemClassification.progression, None, 1))
+        self.assertTrue(self.regions[2].can_reach(state))
+
+    def test_invalidate_rechecks_declared_entrances(self) -> None:
+        """Ensure invalidating a player's reachability falls back to rechecking every blocked entrance."""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.regions[0].can_reach(state))
+        state.collect(Item("Other", ItemClassification.progression, None, 1))
+        state.prog_items[1]["Key"] = 1
+        self.assertFalse(self.regions[0].can_reach(state))
+        state.invalidate_reachable_regions(1)
+        self.assertTrue(self.regions[0].can_reach(state))
+
+    def test_recheck_connections(self) -> None:
+        """Ensure rechecking connections only checks those, unless every blocked entrance gets rechecked anyway."""
+        state = CollectionState(self.multiworld, allow_partial_entrances=True)
+        unconnected = Entrance(1, "Unconnected", self.menu)
+        self.menu.exits.append(unconnected)
+        self.assertFalse(self.regions[2].can_reach(state))
+        checked = []
+        self.key_entrance.access_rule = lambda state: checked.append(True) or state.has("Key", 1)
+        unconnected.connect(self.regions[2])
+        state.recheck_connections(1, (unconnected,))
+        self.assertTrue(self.regions[2].can_reach(state))
+        self.assertFalse(checked)
+
+        state.prog_items[1]["Key"] = 1
+        state.invalidate_reachable_regions(1)
+        state.recheck_connections(1, ())
+        self.assertTrue(self.regions[0].can_reach(state))
+
+
+class TestStateCopy(unittest.TestCase):
+    def test_copy_is_independent(self) -> None:
+        """Ensure collecting into a copied state does not modify the original state and vice versa."""
+        multiworld = generate_test_multiworld(2)
+        state = CollectionState(multiworld)
+        state.collect(Item("Shared", ItemClassification.progression, None, 1), True)
+        copied_state = state.copy()
+        copied_state.collect(Item("Copy Only", ItemClassification.progression, None, 1), True)
+        state.collect(Item("Original Only", ItemClassification.progression, None, 2), True)
+        self.assertTrue(copied_state.has("Shared", 1))
+        self.assertTrue(copied_state.has("Copy Only", 1))
+        self.assertFalse(state.has("Copy Only", 1))
+        self.assertTrue(state.has("Original Only", 2))
+        self.assertFalse(copied_state.has("Original Only", 2))
+
+
+class TestItemNameLookups(unittest.TestCase):
+    def test_missing_and_zero_counts(self) -> None:
+        """Ensure item name lookups treat missing names and zero counts alike and don't add missing names to state."""
+        state = CollectionState(generate_test_multiworld(1))
+        state.prog_items[1]["Sword"] = 2
+        state.prog_items[1]["Removed"] = 0
+        self.assertTrue(state.has("Sword", 1, 2))
+        self.assertFalse(state.has("Shield", 1))
+        self.assertEqual(state.count("Shield", 1), 0)
+        self.assertTrue(state.has_all(["Sword"], 1))
+        self.assertFalse(state.has_all(["Sword", "Removed"], 1))
+        self.assertTrue(state.has_any(["Shield", "Sword"], 1))
+        self.assertFalse(state.has_any(["Shield", "Removed"], 1))
+        self.assertTrue(state.has_all_counts({"Sword": 2, "Removed": 0}, 1))
+        self.assertFalse(state.has_any_count({"Shield": 1, "Sword": 3}, 1))
+        self.assertTrue(state.has_from_list(["Shield", "Sword"], 1, 2))
+        self.assertFalse(state.has_from_list_unique(["Shield", "Sword", "Removed"], 1, 2))
+        self.assertEqual(state.count_from_list(["Shield", "Sword", "Sword"], 1), 4)
+        self.assertEqual(state.count_from_list_unique(["Shield", "Sword", "Removed"], 1), 1)
+        self.assertEqual(set(state.prog_items[1]), {"Sword", "Removed"})
+
+
+class TestSphereIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        menu = self.multiworld.get_region("Menu", 1)
+        self.locations = generate_locations(3, 1, menu, address=None)
+        for address, location in enumerate(self.locations, 1):
+            location.address = address
+        self.event_location = generate_locations(1, 1, menu, tag="event")[0]
+        self.key = Item("Key", ItemClassification.progression, 1, 1)
+        self.event = Item("Event", ItemClassification.progression, None, 1)
+        self.filler = Item("Filler", ItemClassification.filler, 2, 1)
+        self.locations[1].access_rule = lambda state: state.has("Key", 1)
+        self.event_location.access_rule = lambda state: state.has("Key", 1)
+        self.locations[2].access_rule = lambda state: state.has("Event", 1)
+        self.multiworld.push_item(self.locations[0], self.key, False)
+        self.multiworld.push_item(self.locations[1], Item("Filler", ItemClassification.filler, 2, 1), False)
+        self.multiworld.push_item(self.event_location, self.event, False)
+        self.multiworld.push_item(self.locations[2], self.filler, False)
+
+    def test_sendable_spheres_collect_events_eagerly(self) -> None:
+        """Ensure events share the sphere they got unlocked in and are left out of sendable spheres."""
+        spheres = list(self.multiworld.get_sendable_spheres())
+        self.assertEqual([{self.locations[0]}, {self.locations[1], self.locations[2]}], spheres)
+
+    def test_spheres_include_events(self) -> None:
+        """Ensure get_spheres keeps events as part of the spheres."""
+        spheres = list(self.multiworld.get_spheres())
+        self.assertEqual([{self.locations[0]}, {self.locations[1], self.event_location}, {self.locations[2]}],
+                         spheres)
+
+    def test_unreachable_locations(self) -> None:
+        """Ensure unreachable locations follow an empty sphere."""
+        self.locations[2].access_rule = lambda state: False
+        spheres = list(self.multiworld.get_sendable_spheres())
+        self.assertEqual([{self.locations[0]}, {self.locations[1]}, set(), {self.locations[2]}], spheres)
+
+    def test_cached_index_is_used(self) -> None:
+        """Ensure a stored sphere index is shared instead of recomputed."""
+        sphere_index = SphereIndex(self.multiworld)
+        self.multiworld.sphere_index = sphere_index
+        self.assertIs(sphere_index, self.multiworld.get_sphere_index())
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+
+        event_sphere_index = SphereIndex(self.multiworld, collect_events_eagerly=False)
+        self.multiworld.event_sphere_index = event_sphere_index
+        self.assertIs(event_sphere_index, self.multiworld.get_sphere_index(collect_events_eagerly=False))
+        self.assertEqual(3, len(list(self.multiworld.get_spheres())))
+        self.assertEqual(3, len(event_sphere_index.spheres))
+
+    def test_spheres_are_computed_lazily(self) -> None:
+        """Ensure iterating the first spheres of an index only computes those."""
+        sphere_index = SphereIndex(self.multiworld, collect_events_eagerly=False)
+        self.assertEqual({self.locations[0]}, next(sphere_index.iter_spheres()))
+        self.assertEqual(1, len(sphere_index._spheres))
+        self.assertEqual(2, sphere_index.sphere_of[self.locations[2]])
+        self.assertTrue(sphere_index.beatable)
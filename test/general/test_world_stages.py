@@ -0,0 +1,48 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import gen_steps, setup_multiworld
+
+
+class TestConcurrentWorldStages(unittest.TestCase):
+    def test_same_result_as_one_at_a_time(self) -> None:
+        """Tests that running world stages on an executor creates the same multiworld as running them in order."""
+        world_types = [AutoWorldRegister.world_types[game] for game in ("APQuest", "Timespinner", "The Witness")]
+        steps = gen_steps[:gen_steps.index("generate_basic") + 1]
+        for seed in (1, 2, 3):
+            with self.subTest(seed=seed):
+                sequential = setup_multiworld(world_types * 2, steps, seed=seed)
+                concurrent = setup_multiworld(world_types * 2, (), seed=seed)
+                with ThreadPoolExecutor(4) as executor, \
+                        mock.patch.object(world_types[0], "concurrent_stages", True), \
+                        mock.patch.object(world_types[1], "concurrent_stages", True):
+                    for step in steps:
+                        call_all(concurrent, step, executor=executor)
+
+                self.assertTrue(concurrent.random.passthrough)
+                self.assertEqual([(item.name, item.player) for item in sequential.itempool],
+                                 [(item.name, item.player) for item in concurrent.itempool])
+                self.assertEqual([(region.name, region.player) for region in sequential.get_regions()],
+                                 [(region.name, region.player) for region in concurrent.get_regions()])
+                self.assertEqual([(location.name, location.player) for location in sequential.get_locations()],
+                                 [(location.name, location.player) for location in concurrent.get_locations()])
+                for player in sequential.player_ids:
+                    self.assertEqual(sequential.worlds[player].random.getstate(),
+                                     concurrent.worlds[player].random.getstate())
+                self.assertEqual(sequential.random.getstate(), concurrent.random.getstate())
+
+    def test_multiworld_random_blocked(self) -> None:
+        """Tests that worlds running concurrently can't draw from the shared multiworld.random."""
+        world_type = AutoWorldRegister.world_types["APQuest"]
+        multiworld = setup_multiworld([world_type, world_type], ())
+
+        def generate_early(world: object) -> None:
+            multiworld.random.random()
+
+        with ThreadPoolExecutor(2) as executor, mock.patch.object(world_type, "concurrent_stages", True), \
+                mock.patch.object(world_type, "generate_early", generate_early):
+            with self.assertRaises(RuntimeError):
+                call_all(multiworld, "generate_early", executor=executor)
+        self.assertTrue(multiworld.random.passthrough)
@@ -241,6 +241,22 @@ class Base:
             self.assertEqual(len(store[1]), 1)
             self.assertEqual(len(store[2]), 0)
 
+        def test_receiver_without_locations(self) -> None:
+            # receiver 3 is not a sender, like an item link group
+            store = self.type({
+                1: {1: (5, 3, 0), 2: (6, 3, 0), 3: (5, 3, 1)},
+                2: {1: (5, 3, 4), 2: (5, 1, 0)},
+            })
+            self.assertEqual(sorted(store.find_item({3}, 5)),
+                             [(1, 1, 5, 3, 0), (1, 3, 5, 3, 1), (2, 1, 5, 3, 4)])
+            self.assertEqual(sorted(store.find_item({1, 3}, 5)),
+                             [(1, 1, 5, 3, 0), (1, 3, 5, 3, 1), (2, 1, 5, 3, 4), (2, 2, 5, 1, 0)])
+            self.assertEqual(sorted(store.find_item({3}, 6)), [(1, 2, 6, 3, 0)])
+            self.assertEqual(sorted(store.find_item({0, 4, 1000001}, 5)), [])
+            self.assertEqual(store.get_for_player(3), {1: {1, 2, 3}, 2: {1}})
+            self.assertEqual(store.get_for_player(1), {2: {2}})
+            self.assertEqual(store.get_for_player(2), {})
+
 
 class TestPurePythonLocationStore(Base.TestLocationStore):
     """Run base method tests for pure python implementation."""
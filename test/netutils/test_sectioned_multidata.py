@@ -0,0 +1,64 @@
+import io
+import unittest
+
+from NetUtils import NetworkSlot, SectionedMultiData, SlotType, dump_sectioned_multidata
+
+
+class TestSectionedMultiData(unittest.TestCase):
+    multidata = {
+        "slot_data": {1: {"goal": 1}, 2: {"goal": 2}},
+        "slot_info": {1: NetworkSlot("Player1", "Game", SlotType.player),
+                      2: NetworkSlot("Player2", "Game", SlotType.player)},
+        "locations": {1: {100: (200, 2, 0)}, 2: {101: (201, 1, 0)}},
+        "datapackage": {"Game": {"checksum": "abc", "item_name_to_id": {"Item": 200}}},
+        "seed_name": "Seed",
+    }
+
+    def dump(self, multidata) -> bytes:
+        file = io.BytesIO()
+        dump_sectioned_multidata(multidata, file)
+        return file.getvalue()
+
+    def test_round_trip(self) -> None:
+        data = self.dump(self.multidata)
+        self.assertEqual(data[0], SectionedMultiData.format_version)
+        multidata = SectionedMultiData(data)
+        self.assertEqual(list(multidata), list(self.multidata))
+        self.assertEqual({key: dict(value) if key == "slot_data" else value for key, value in multidata.items()},
+                         self.multidata)
+
+    def test_lazy(self) -> None:
+        """Tests that only accessed sections, and slots of slot data, are decompressed."""
+        multidata = SectionedMultiData(self.dump(self.multidata))
+        self.assertIn("locations", multidata)
+        self.assertIsNotNone(multidata.get_raw_section("locations"))
+        self.assertEqual(multidata["slot_data"][2], {"goal": 2})
+        self.assertIsNone(multidata.get_raw_section(("slot_data", 2)))
+        self.assertIsNotNone(multidata.get_raw_section(("slot_data", 1)))
+        self.assertIsNotNone(multidata.get_raw_section("locations"))
+
+    def test_modify(self) -> None:
+        """Tests that modified sections are written again and untouched ones are copied."""
+        multidata = SectionedMultiData(self.dump(self.multidata))
+        multidata["datapackage"]["Game"] = {"checksum": "abc"}
+        del multidata["seed_name"]
+        multidata["race_mode"] = 1
+
+        copied = SectionedMultiData(self.dump(multidata))
+        self.assertEqual(copied["datapackage"], {"Game": {"checksum": "abc"}})
+        self.assertNotIn("seed_name", copied)
+        self.assertEqual(copied["race_mode"], 1)
+        self.assertEqual(copied["locations"], self.multidata["locations"])
+        self.assertEqual(dict(copied["slot_data"]), self.multidata["slot_data"])
+
+    def test_retain(self) -> None:
+        """Tests that retained keys can still be read once everything else was dropped."""
+        multidata = SectionedMultiData(self.dump(self.multidata))
+        slot_data = multidata["slot_data"]
+        self.assertEqual(multidata["seed_name"], "Seed")
+        multidata.retain(("slot_data", "seed_name"))
+        self.assertEqual(list(multidata), ["slot_data", "seed_name"])
+        self.assertEqual(dict(slot_data), self.multidata["slot_data"])
+        self.assertEqual(multidata["seed_name"], "Seed")
+        self.assertNotIn("locations", multidata)
+        self.assertEqual(SectionedMultiData(self.dump(multidata))["slot_data"][1], {"goal": 1})
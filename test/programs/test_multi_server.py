@@ -1,5 +1,17 @@
+import asyncio
+import os
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from unittest import mock
+import zlib
+
+from typing_extensions import override
+
+from MultiServer import (Client, Context, SaveJournal, ServerCommandProcessor, encode_game_package, process_client_cmd,
+                         send_items_to, send_new_items, update_aliases)
+from NetUtils import Endpoint, GamesPackage, Hint, HintStatus, NetworkItem, decode
+from Utils import restricted_loads
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +50,354 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class SaveTestContext(Context):
+    @override
+    def _load_game_data(self) -> None:
+        pass  # saving does not need the data package
+
+
+class TestSaveJournal(unittest.TestCase):
+    temp_dir: tempfile.TemporaryDirectory[str]
+    save_filename: str
+    ctx: Context
+    journal: SaveJournal
+
+    @override
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.save_filename = os.path.join(self.temp_dir.name, "test.apsave")
+        self.ctx = self.create_context()
+        self.ctx.saving = True
+        self.journal = self.ctx.save_journal = SaveJournal(self.save_filename + ".journal")
+
+    @override
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def create_context(self) -> Context:
+        ctx = SaveTestContext("", 0, "", "", 0, 0, False)
+        ctx.connect_names = {"Player1": (0, 1), "Player2": (0, 2)}
+        ctx.save_filename = self.save_filename
+        return ctx
+
+    def load(self) -> typing.Tuple[Context, SaveJournal]:
+        ctx = self.create_context()
+        with open(self.save_filename, "rb") as f:
+            encoded_save = f.read()
+        journal = ctx.save_journal = SaveJournal(self.save_filename + ".journal")
+        save_data: typing.Dict[str, typing.Any] = restricted_loads(zlib.decompress(encoded_save))
+        ctx.set_save(journal.replay(save_data, len(encoded_save)))
+        return ctx, journal
+
+    def check_location(self, team: int, slot: int, location: int, item: NetworkItem) -> None:
+        self.ctx.location_checks[team, slot].add(location)
+        self.journal.add_location_checks((team, slot), {location})
+        self.ctx.received_items.setdefault((team, item.player, True), []).append(item)
+
+    def assertSameSave(self, ctx: Context) -> None:
+        self.assertEqual(ctx.received_items, self.ctx.received_items)
+        self.assertEqual(dict(ctx.location_checks), dict(self.ctx.location_checks))
+        self.assertEqual(dict(ctx.hints), dict(self.ctx.hints))
+        self.assertEqual(ctx.stored_data, self.ctx.stored_data)
+        self.assertEqual(dict(ctx.hints_used), dict(self.ctx.hints_used))
+
+    def test_journal(self) -> None:
+        """Tests that saves after the first one are journaled and replayed on load."""
+        self.check_location(0, 1, 100, NetworkItem(1, 100, 1, 0))
+        self.assertTrue(self.ctx.save(now=True))
+        self.assertEqual(self.journal.size, 0)
+        self.journal.save_size = 1 << 20  # never compact
+
+        self.check_location(0, 1, 101, NetworkItem(2, 101, 1, 0))
+        self.check_location(0, 2, 200, NetworkItem(3, 200, 1, 0))
+        hint = Hint(1, 2, 201, 3, False)
+        self.ctx.hints[0, 1].add(hint)
+        self.journal.add_hint_keys(((0, 1),))
+        stored_value = [1, 2]
+        self.ctx.stored_data["key"] = stored_value
+        self.journal.add_stored_data_key("key")
+        self.assertTrue(self.ctx.save(now=True))
+        self.ctx.hints_used[0, 1] += 1
+        self.ctx.replace_hint(0, 1, hint, hint._replace(status=HintStatus.HINT_AVOID))
+        stored_value.append(3)
+        self.journal.add_stored_data_key("key")
+        self.assertTrue(self.ctx.save(now=True))
+        self.assertGreater(self.journal.size, 0)
+
+        self.assertSameSave(self.load()[0])
+
+    def test_entries_skip_full_save(self) -> None:
+        """Tests that journal entries hold every save data key without building a full save."""
+        self.assertTrue(self.ctx.save(now=True))
+        self.journal.save_size = 1 << 20
+        self.assertEqual(set(self.ctx.get_save()),
+                         set(self.ctx.get_unjournaled_save()) | set(SaveJournal.journaled_keys))
+        with mock.patch.object(self.ctx, "get_save", side_effect=AssertionError("full save built")):
+            self.check_location(0, 1, 100, NetworkItem(1, 100, 1, 0))
+            self.assertTrue(self.ctx.save(now=True))
+        self.assertGreater(self.journal.size, 0)
+
+        self.assertSameSave(self.load()[0])
+
+    def test_compaction(self) -> None:
+        """Tests that outgrowing the save file writes a new one and ignores the old journal."""
+        self.check_location(0, 1, 100, NetworkItem(1, 100, 1, 0))
+        self.assertTrue(self.ctx.save(now=True))
+        for location in range(101, 200):
+            self.check_location(0, 2, location, NetworkItem(location, location, 2, 0))
+            self.assertTrue(self.ctx.save(now=True))
+        self.assertLess(self.journal.size, self.journal.save_size)
+        self.assertGreater(self.journal.save_id or 0, 1)
+
+        ctx, journal = self.load()
+        self.assertSameSave(ctx)
+        self.assertEqual(journal.save_id, self.journal.save_id)
+
+    def test_overlapping_entry(self) -> None:
+        """Tests that items which made it into both the save file and the journal are not received twice."""
+        self.assertTrue(self.ctx.save(now=True))
+        self.journal.save_size = 1 << 20
+        self.check_location(0, 1, 100, NetworkItem(1, 100, 1, 0))
+        changes = self.journal.get_changes(self.ctx)
+        self.journal.append(changes)
+        self.journal.append(changes)
+
+        self.assertSameSave(self.load()[0])
+
+
+async def run_loop_iterations(count: int = 3) -> None:
+    """Lets callbacks scheduled for the next loop iterations, and the tasks they start, run."""
+    for _ in range(count):
+        await asyncio.sleep(0)
+
+
+def create_client(ctx: Context, team: int, slot: int) -> Client:
+    client = Client(typing.cast(typing.Any, None), ctx)  # no socket, sending is recorded by SendTestContext
+    client.team, client.slot = team, slot
+    return client
+
+
+class SendTestContext(SaveTestContext):
+    sent: typing.List[typing.Tuple[Endpoint, typing.List[typing.Dict[str, typing.Any]]]]
+
+    @override
+    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[typing.Dict[str, typing.Any]]) -> bool:
+        self.sent.append((endpoint, list(msgs)))
+        return True
+
+    @override
+    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+        self.sent.append((endpoint, decode(msg)))
+        return True
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    clients: typing.Dict[int, Client]
+
+    @override
+    def setUp(self) -> None:
+        self.ctx = SendTestContext("", 0, "", "", 0, 0, False)
+        self.ctx.sent = []
+        self.ctx.clients = {0: {}}
+        self.clients = {}
+        for slot in (1, 2):
+            client = create_client(self.ctx, 0, slot)
+            client.items_handling = 0b111
+            self.ctx.clients[0][slot] = [client]
+            self.clients[slot] = client
+
+    async def test_coalesced(self) -> None:
+        """Tests that items sent within one loop iteration arrive in one message, only for the receiving slot."""
+        for location in range(3):
+            send_items_to(self.ctx, 0, 1, NetworkItem(location, location, 2, 0))
+            send_new_items(self.ctx)
+        await run_loop_iterations()
+
+        self.assertEqual(len(self.ctx.sent), 1)
+        client, msgs = self.ctx.sent[0]
+        self.assertIs(client, self.clients[1])
+        self.assertEqual(msgs[0]["index"], 0)
+        self.assertEqual([item.item for item in msgs[0]["items"]], [0, 1, 2])
+        self.assertEqual(self.clients[1].send_index, 3)
+        self.assertEqual(self.clients[2].send_index, 0)
+        self.assertFalse(self.ctx.new_item_slots)
+
+        send_items_to(self.ctx, 0, 1, NetworkItem(3, 3, 2, 0))
+        send_new_items(self.ctx)
+        await run_loop_iterations()
+        self.assertEqual(self.ctx.sent[1][1][0]["index"], 3)
+
+
+class TestHintIndex(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.ctx = SaveTestContext("", 0, "", "", 0, 0, False)
+        self.checked_hint = Hint(2, 1, 100, 3, False)
+        self.other_hint = Hint(1, 1, 101, 4, False)
+        for slot in (1, 2):
+            self.ctx.hints[0, slot].add(self.checked_hint)
+        self.ctx.hints[0, 1].add(self.other_hint)
+        self.ctx.index_hints()
+
+    def test_get_hint(self) -> None:
+        self.assertEqual(self.ctx.get_hint(0, 1, 100), self.checked_hint)
+        self.assertEqual(self.ctx.get_hint(0, 1, 101), self.other_hint)
+        self.assertIsNone(self.ctx.get_hint(0, 2, 100))
+        self.assertIsNone(self.ctx.get_hint(1, 1, 100))
+
+    def test_recheck_location_hints(self) -> None:
+        """Tests that checking a location updates its hint for both concerned slots and leaves others alone."""
+        self.ctx.location_checks[0, 1] |= {100, 101}
+        changed: typing.Set[typing.Tuple[int, int]] = set()
+        self.ctx.recheck_location_hints(0, 1, [100], changed)
+
+        found_hint = self.ctx.get_hint(0, 1, 100)
+        assert found_hint
+        self.assertTrue(found_hint.found)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        self.assertEqual(self.ctx.hints[0, 1], {found_hint, self.other_hint})
+        self.assertEqual(self.ctx.hints[0, 2], {found_hint})
+        self.assertEqual(self.ctx.get_hint(0, 1, 101), self.other_hint)
+
+    def test_full_recheck(self) -> None:
+        """Tests that a full recheck swaps in a new index instead of emptying the one in use."""
+        old_index = self.ctx.hint_index
+        self.ctx.recheck_hints()
+        self.assertIsNot(self.ctx.hint_index, old_index)
+        self.assertEqual(old_index, self.ctx.hint_index)
+
+
+class TestDataStorage(unittest.IsolatedAsyncioTestCase):
+    clients: typing.Dict[int, Client]
+
+    @override
+    def setUp(self) -> None:
+        self.ctx = SendTestContext("", 0, "", "", 0, 0, False)
+        self.ctx.sent = []
+        self.clients = {}
+        for slot in (1, 2, 3):
+            client = create_client(self.ctx, 0, slot)
+            client.auth = True
+            self.clients[slot] = client
+
+    def get_replies(self, client: Client) -> typing.List[typing.Dict[str, typing.Any]]:
+        return [msg for endpoint, msgs in self.ctx.sent if endpoint is client for msg in msgs]
+
+    async def test_batched_notifications(self) -> None:
+        """Tests that SetReplies of one loop iteration arrive together, for direct and prefix subscriptions."""
+        await process_client_cmd(self.ctx, self.clients[1], {"cmd": "SetNotify", "keys": [], "prefixes": ["shared_"]})
+        await process_client_cmd(self.ctx, self.clients[2], {"cmd": "SetNotify", "keys": ["shared_a"]})
+        for key in ("shared_a", "shared_a", "shared_b"):
+            await process_client_cmd(self.ctx, self.clients[3], {
+                "cmd": "Set", "key": key, "default": [], "operations": [{"operation": "add", "value": [1]}]})
+        await run_loop_iterations()
+
+        self.assertEqual(len(self.ctx.sent), 2)
+        self.assertEqual([(reply["key"], reply["value"]) for reply in self.get_replies(self.clients[1])],
+                         [("shared_a", [1]), ("shared_a", [1, 1]), ("shared_b", [1])])
+        replies = self.get_replies(self.clients[2])
+        self.assertEqual([(reply["original_value"], reply["value"]) for reply in replies], [([], [1]), ([1], [1, 1])])
+        self.assertEqual(replies[0]["slot"], 3)
+        self.assertFalse(self.get_replies(self.clients[3]))
+
+    async def test_literal_keys(self) -> None:
+        """Tests that keys are only matched exactly and empty prefixes are rejected."""
+        await process_client_cmd(self.ctx, self.clients[1], {"cmd": "SetNotify", "keys": ["shared_*"]})
+        await process_client_cmd(self.ctx, self.clients[2], {"cmd": "SetNotify", "keys": [], "prefixes": [""]})
+        for key in ("shared_a", "shared_*"):
+            await process_client_cmd(self.ctx, self.clients[3], {
+                "cmd": "Set", "key": key, "operations": [{"operation": "replace", "value": 1}]})
+        await run_loop_iterations()
+
+        self.assertEqual([reply["key"] for reply in self.get_replies(self.clients[1])], ["shared_*"])
+        self.assertEqual([reply["cmd"] for reply in self.get_replies(self.clients[2])], ["InvalidPacket"])
+
+    async def test_reply_order(self) -> None:
+        """Tests that the SetReply to a Set with want_reply arrives before the reply to a following Get."""
+        await process_client_cmd(self.ctx, self.clients[1], {"cmd": "SetNotify", "keys": ["key"]})
+        await process_client_cmd(self.ctx, self.clients[1], {
+            "cmd": "Set", "key": "key", "want_reply": True, "operations": [{"operation": "replace", "value": 1}]})
+        await process_client_cmd(self.ctx, self.clients[1], {"cmd": "Get", "keys": ["key"]})
+        await run_loop_iterations()
+
+        self.assertEqual([reply["cmd"] for reply in self.get_replies(self.clients[1])], ["SetReply", "Retrieved"])
+
+    async def test_value_size_limit(self) -> None:
+        """Tests that a Set growing a value past the limit is rejected and leaves the value as it was."""
+        self.ctx.data_storage_max_value_size = 1000
+        self.ctx.stored_data["key"] = [0]
+        await process_client_cmd(self.ctx, self.clients[1], {
+            "cmd": "Set", "key": "key", "operations": [{"operation": "update", "value": list(range(1, 1000))}]})
+
+        self.assertEqual(self.ctx.stored_data["key"], [0])
+        self.assertEqual(self.ctx.sent[0][1][0]["cmd"], "InvalidPacket")
+
+
+class TestDataPackage(unittest.TestCase):
+    @override
+    def setUp(self) -> None:
+        self.ctx = SaveTestContext("", 0, "", "", 0, 0, False)
+        gamespackage: typing.Dict[str, GamesPackage] = {
+            "Game A": {"item_name_to_id": {"Item \u00e9": 1}, "location_name_to_id": {"Spot": 2}, "checksum": "a1"},
+            "Game B": {"item_name_to_id": {}, "location_name_to_id": {}},
+        }
+        self.ctx.gamespackage = gamespackage
+
+    def test_encoded_data_package(self) -> None:
+        """Tests that the assembled message matches encoding the whole DataPackage at once."""
+        self.assertEqual(decode(self.ctx.get_encoded_data_package(["Game A", "Game B"])),
+                         [{"cmd": "DataPackage", "data": {"games": self.ctx.gamespackage}}])
+        self.assertEqual(decode(self.ctx.get_encoded_data_package([])),
+                         [{"cmd": "DataPackage", "data": {"games": {}}}])
+
+    def test_reuses_same_checksum(self) -> None:
+        encoded = encode_game_package("Game A", self.ctx.gamespackage["Game A"])
+        same_checksum: GamesPackage = {"item_name_to_id": {}, "location_name_to_id": {}, "checksum": "a1"}
+        self.assertIs(encode_game_package("Game A", same_checksum), encoded)
+        self.assertIsNot(encode_game_package("Game C", same_checksum), encoded)
+
+
+class TestOutbox(unittest.IsolatedAsyncioTestCase):
+    @override
+    def setUp(self) -> None:
+        self.ctx = SendTestContext("", 0, "", "", 0, 0, False)
+        self.ctx.sent = []
+        self.clients = [create_client(self.ctx, 0, slot) for slot in (1, 2)]
+        self.ctx.clients = {0: {1: self.clients[:1], 2: self.clients[1:]}}
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+
+    async def test_merged(self) -> None:
+        """Tests that messages queued in one loop iteration arrive in order, in one message per client."""
+        self.ctx.broadcast(self.clients, [{"cmd": "PrintJSON", "data": [{"text": "both"}]}])
+        self.ctx.broadcast(self.clients[:1], [{"cmd": "RoomUpdate", "hint_points": 1}])
+        self.ctx.broadcast(self.clients, [{"cmd": "PrintJSON", "data": [{"text": "both again"}]}])
+        await run_loop_iterations()
+
+        self.assertEqual(len(self.ctx.sent), 2)
+        sent = dict(self.ctx.sent)
+        self.assertEqual([msg["cmd"] for msg in sent[self.clients[0]]], ["PrintJSON", "RoomUpdate", "PrintJSON"])
+        self.assertEqual([msg["data"][0]["text"] for msg in sent[self.clients[1]]], ["both", "both again"])
+
+    async def test_room_update_order(self) -> None:
+        """Tests that a RoomUpdate for changed aliases doesn't overtake messages queued before it."""
+        self.ctx.broadcast(self.clients, [{"cmd": "PrintJSON", "data": [{"text": "before"}]}])
+        update_aliases(self.ctx, 0)
+        await run_loop_iterations()
+
+        for client in self.clients:
+            self.assertEqual([msg["cmd"] for endpoint, msgs in self.ctx.sent if endpoint is client for msg in msgs],
+                             ["PrintJSON", "RoomUpdate"])
+
+    async def test_falling_behind(self) -> None:
+        """Tests that clients with a full write buffer get a summary instead of text, but still get other messages."""
+        self.ctx.text_backlog_limit = -1
+        for _ in range(3):
+            self.ctx.broadcast(self.clients[:1], [{"cmd": "PrintJSON", "data": [{"text": "text"}]}])
+        self.ctx.broadcast(self.clients[:1], [{"cmd": "RoomUpdate", "hint_points": 1}])
+        await run_loop_iterations()
+
+        (_, msgs), = self.ctx.sent
+        self.assertEqual([msg["cmd"] for msg in msgs], ["RoomUpdate", "PrintJSON"])
+        self.assertIn("3", msgs[1]["data"][0]["text"])
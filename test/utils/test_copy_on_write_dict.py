@@ -0,0 +1,60 @@
+# Tests for CopyOnWriteDict in Utils.py
+
+import unittest
+
+from Utils import CopyOnWriteDict
+
+
+class TestCopyOnWriteDict(unittest.TestCase):
+    def test_share_isolates_modifications(self) -> None:
+        original = CopyOnWriteDict({1: {"a"}, 2: {"b"}})
+        shared = original.share()
+        shared[1].add("c")
+        original[2].add("d")
+        self.assertEqual({"a"}, original[1])
+        self.assertEqual({"a", "c"}, shared[1])
+        self.assertEqual({"b", "d"}, original[2])
+        self.assertEqual({"b"}, shared[2])
+
+    def test_untouched_values_are_not_copied(self) -> None:
+        value = {"a"}
+        original = CopyOnWriteDict({1: value, 2: {"b"}})
+        shared = original.share()
+        shared[2].add("c")
+        self.assertIs(value, shared.shared[1])
+        self.assertIs(value, original.shared[1])
+
+    def test_peek_does_not_copy(self) -> None:
+        value = {"a"}
+        original = CopyOnWriteDict({1: value})
+        shared = original.share()
+        self.assertIs(value, shared.peek(1))
+        self.assertIs(value, original.peek(1))
+        shared[1].add("b")
+        self.assertEqual({"a", "b"}, shared.peek(1))
+        self.assertEqual({"a"}, original.peek(1))
+
+    def test_equality_of_shared_values(self) -> None:
+        original = CopyOnWriteDict({1: {"a"}, 2: {"b"}})
+        shared = original.share()
+        self.assertEqual(original, shared)
+        self.assertEqual(shared, {1: {"a"}, 2: {"b"}})
+        self.assertIs(original.shared, shared.shared)
+        shared[1].add("c")
+        self.assertNotEqual(original, shared)
+        self.assertNotEqual(shared, {1: {"a"}, 2: {"b"}})
+
+    def test_mapping_behaviour(self) -> None:
+        original = CopyOnWriteDict({1: {"a"}, 2: {"b"}})
+        shared = original.share()
+        self.assertIn(1, shared)
+        self.assertNotIn(3, shared)
+        self.assertEqual(2, len(shared))
+        self.assertEqual([1, 2], sorted(shared))
+        self.assertIsNone(shared.get(3))
+        self.assertEqual({1: {"a"}, 2: {"b"}}, dict(shared.items()))
+        del shared[1]
+        self.assertNotIn(1, shared)
+        self.assertIn(1, original)
+        with self.assertRaises(KeyError):
+            _ = shared[1]
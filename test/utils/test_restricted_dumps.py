@@ -0,0 +1,35 @@
+import collections
+import io
+import pickle
+import unittest
+import zlib
+
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from Utils import ZlibWriter, restricted_dump, restricted_dumps, restricted_loads
+
+
+class TestRestrictedDumps(unittest.TestCase):
+    data = {
+        "locations": {1: {2: (3, 4, 5)}},
+        "slot_info": {1: NetworkSlot("Player", "Game", SlotType.player)},
+        "items": [NetworkItem(1, 2, 3, 0)],
+        "hints": {Hint(1, 2, 3, 4, False)},
+        "status": ClientStatus.CLIENT_GOAL,
+        "counter": collections.Counter({"Item": 2}),
+        "names": frozenset({"Player"}),
+    }
+
+    def test_round_trip(self) -> None:
+        self.assertEqual(restricted_loads(restricted_dumps(self.data)), self.data)
+
+    def test_forbidden(self) -> None:
+        """Tests that anything restricted_loads would refuse is refused while pickling."""
+        for forbidden in (collections.OrderedDict(), collections.deque(), range(3), print, pickle.Pickler):
+            with self.subTest(forbidden=forbidden), self.assertRaises(pickle.PicklingError):
+                restricted_dumps({"nested": [forbidden]})
+
+    def test_compressed(self) -> None:
+        file = io.BytesIO()
+        with ZlibWriter(file, 1) as compressed:
+            restricted_dump(self.data, compressed)
+        self.assertEqual(restricted_loads(zlib.decompress(file.getvalue())), self.data)
@@ -0,0 +1,54 @@
+import unittest
+from uuid import uuid4
+
+from WebHostLib.autolauncher import MultiworldInstance, pick_hoster
+from WebHostLib.customserver import RoomLoad
+
+
+class TestPickHoster(unittest.TestCase):
+    def setUp(self) -> None:
+        config = {"PONY": {}, "SELFLAUNCHCERT": None, "SELFLAUNCHKEY": None, "HOST_ADDRESS": "localhost",
+                  "HOT_ROOM_LOAD": 0.25, "HOSTER_MEMORY_LIMIT": 1000}
+        self.hosters = [MultiworldInstance(config, x) for x in range(3)]
+
+    def add_room(self, hoster: MultiworldInstance, busy: float) -> None:
+        room_id = uuid4()
+        hoster.room_ids.add(room_id)
+        hoster.room_loads[room_id] = RoomLoad(0, busy)
+        if busy >= hoster.hot_room_load:
+            hoster.hot_room_ids.add(room_id)
+
+    def test_least_loaded(self) -> None:
+        self.add_room(self.hosters[0], 0.1)
+        self.add_room(self.hosters[1], 0.05)
+        self.add_room(self.hosters[1], 0.01)
+        self.add_room(self.hosters[2], 0.2)
+        self.assertIs(pick_hoster(self.hosters, False), self.hosters[1])
+
+    def test_unreported_rooms(self) -> None:
+        """Tests that rooms started before their first load report still spread across hosters."""
+        self.hosters[0].room_ids.add(uuid4())
+        self.assertIsNot(pick_hoster(self.hosters, False), self.hosters[0])
+
+    def test_hot_rooms(self) -> None:
+        """Tests that hot rooms get an empty hoster and other rooms avoid hosters of hot rooms."""
+        self.add_room(self.hosters[0], 0.5)
+        self.add_room(self.hosters[1], 0.01)
+        self.add_room(self.hosters[2], 0.02)
+        self.assertIs(pick_hoster(self.hosters, False), self.hosters[1])
+        self.assertIs(pick_hoster(self.hosters, True), self.hosters[1])
+        self.hosters[2].room_ids.clear()
+        self.hosters[2].room_loads.clear()
+        self.assertIs(pick_hoster(self.hosters, True), self.hosters[2])
+
+    def test_memory(self) -> None:
+        """Tests that hosters above their memory limit are avoided and memory decides between equal loads."""
+        self.hosters[0].memory = 2000
+        self.hosters[1].memory = 500
+        self.hosters[2].memory = 100
+        self.assertIs(pick_hoster(self.hosters, False), self.hosters[2])
+        self.add_room(self.hosters[2], 0.01)
+        self.assertIs(pick_hoster(self.hosters, False), self.hosters[1])
+        self.add_room(self.hosters[1], 0.01)
+        self.hosters[1].memory = 1500
+        self.assertIs(pick_hoster(self.hosters, False), self.hosters[2])
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import typing
+from uuid import uuid4
+
+from . import TestBase
+
+
+class FakeRoomContext:
+    def __init__(self) -> None:
+        self.commands: typing.List[str] = []
+
+    def db_command_processor(self, command: str) -> None:
+        self.commands.append(command)
+
+
+class TestDispatchDBCommands(TestBase):
+    def test_dispatch(self) -> None:
+        """Tests that commands reach their running room and commands of other rooms stay in the database."""
+        from pony.orm import db_session, select
+        from WebHostLib.customserver import dispatch_db_commands
+        from WebHostLib.models import Command, Room, Seed
+
+        with db_session:
+            seed = Seed(multidata=b"", owner=uuid4())
+            running_room = Room(seed=seed, owner=seed.owner)
+            other_room = Room(seed=seed, owner=seed.owner)
+            Command(room=running_room, commandtext="/status")
+            Command(room=other_room, commandtext="/exit")
+            running_room_id, other_room_id = running_room.id, other_room.id
+
+        ctx = FakeRoomContext()
+        # like in a room server process, commands are dispatched from another thread than the loop's
+        loop = asyncio.new_event_loop()
+        loop_thread = threading.Thread(target=loop.run_forever)
+        loop_thread.start()
+        try:
+            dispatch_db_commands({running_room_id: ctx}, loop)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join()
+            loop.close()
+
+        self.assertEqual(ctx.commands, ["/status"])
+        with db_session:
+            self.assertEqual([command.room.id for command in select(command for command in Command)],
+                             [other_room_id])
+            Room[other_room_id].delete()
+            Room[running_room_id].delete()
+            Seed[seed.id].delete()
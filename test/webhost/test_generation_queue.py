@@ -0,0 +1,115 @@
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import queue
+import time
+import typing
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from WebHostLib.autolauncher import GenerationQueue, generation_priority
+from WebHostLib.generate import run_with_timeout
+
+
+class TestGenerationPriority(unittest.TestCase):
+    def test_smaller_first(self) -> None:
+        self.assertLess(generation_priority(2, 0), generation_priority(20, 0))
+
+    def test_waiting_raises_priority(self) -> None:
+        self.assertLess(generation_priority(20, 600), generation_priority(2, 0))
+
+
+class PendingResult:
+    def ready(self) -> bool:
+        return False
+
+    def wait(self, timeout: typing.Optional[float] = None) -> None:
+        pass
+
+
+class TestGenerationQueue(unittest.TestCase):
+    def test_positions(self) -> None:
+        """Ensure queued generations get an eta by rounds of generators, which is only rewritten with the position."""
+        generation_queue = GenerationQueue(typing.cast(typing.Any, None), 2, None)
+        generations = [SimpleNamespace(meta="{}") for _ in range(3)]
+        generation_queue.update_positions(typing.cast(typing.Any, generations))
+        self.assertEqual([{"position": 1}, {"position": 2}, {"position": 3}],
+                         [json.loads(generation.meta)["queue"] for generation in generations])
+
+        generation_queue.durations.append(60)
+        now = time.time()
+        with mock.patch("time.time", return_value=now):
+            generation_queue.update_positions(typing.cast(typing.Any, generations))
+        self.assertEqual([int(now) + 60, int(now) + 60, int(now) + 120],
+                         [json.loads(generation.meta)["queue"]["eta"] for generation in generations])
+
+        metas = [generation.meta for generation in generations]
+        with mock.patch("time.time", return_value=now + 5):
+            generation_queue.update_positions(typing.cast(typing.Any, generations))
+            self.assertEqual(metas, [generation.meta for generation in generations])
+            generation_queue.update_positions(typing.cast(typing.Any, generations[1:]))
+        self.assertEqual({"position": 1, "eta": int(now) + 65}, json.loads(generations[1].meta)["queue"])
+        self.assertEqual({"position": 2, "eta": int(now) + 65}, json.loads(generations[2].meta)["queue"])
+
+    def test_dead_worker(self) -> None:
+        """Ensure generations whose worker process died stop taking up a generator without a job time."""
+        started_generations: queue.Queue[typing.Tuple[uuid.UUID, int]] = queue.Queue()
+        generation_queue = GenerationQueue(typing.cast(typing.Any, None), 2, None,
+                                           typing.cast(typing.Any, started_generations))
+        dead, unreported = uuid.uuid4(), uuid.uuid4()
+        generation_queue.running[dead] = typing.cast(typing.Any, PendingResult()), time.monotonic()
+        generation_queue.running[unreported] = typing.cast(typing.Any, PendingResult()), time.monotonic()
+        started_generations.put((dead, os.getpid()))  # not a child process, so not a living worker
+        generation_queue.collect()
+        self.assertEqual({unreported}, generation_queue.running.keys())
+        self.assertFalse(generation_queue.worker_pids)
+
+    def test_stuck_worker(self) -> None:
+        """Ensure generations well past their time keep their generator until their terminated worker is gone."""
+        started_generations: queue.Queue[typing.Tuple[uuid.UUID, int]] = queue.Queue()
+        generation_queue = GenerationQueue(typing.cast(typing.Any, None), 2, 1,
+                                           typing.cast(typing.Any, started_generations))
+        worker = multiprocessing.Process(target=time.sleep, args=(30,))
+        worker.start()
+        self.addCleanup(worker.kill)
+        stuck = uuid.uuid4()
+        generation_queue.running[stuck] = typing.cast(typing.Any, PendingResult()), time.monotonic() - 10
+        started_generations.put((stuck, typing.cast(int, worker.pid)))
+        generation_queue.collect()
+        self.assertIn(stuck, generation_queue.running)
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        generation_queue.collect()
+        self.assertFalse(generation_queue.running)
+
+
+class TestRunWithTimeout(unittest.TestCase):
+    def test_returns_result(self) -> None:
+        self.assertEqual(run_with_timeout(lambda: "seed", 10), "seed")
+
+    def test_interrupts(self) -> None:
+        def task() -> None:
+            time.sleep(5)
+
+        start = time.monotonic()
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            run_with_timeout(task, 0.1)
+        self.assertLess(time.monotonic() - start, 4)
+
+    def test_interrupts_task_threads(self) -> None:
+        def output() -> None:
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        def task() -> None:
+            with concurrent.futures.ThreadPoolExecutor(1) as pool:
+                pool.submit(output).result()
+
+        start = time.monotonic()
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            run_with_timeout(task, 0.1)
+        self.assertLess(time.monotonic() - start, 4)
@@ -0,0 +1,42 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from WebHostLib.customserver import StaticServerData
+
+
+class TestStaticServerData(unittest.TestCase):
+    games = {
+        "Archipelago": {
+            "gamespackage": {"item_name_to_id": {"Nothing": -1}, "location_name_to_id": {"Cheat Console": -1},
+                             "checksum": "a"},
+            "item_name_groups": {"Everything": {"Nothing"}},
+            "location_name_groups": {},
+            "non_hintable_names": frozenset(),
+        },
+        "Game": {
+            "gamespackage": {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 1},
+                             "checksum": "b"},
+            "item_name_groups": {"Everything": {"Item"}},
+            "location_name_groups": {"Everywhere": {"Location"}},
+            "non_hintable_names": frozenset({"Item"}),
+        },
+    }
+
+    def setUp(self) -> None:
+        file_descriptor, self.path = tempfile.mkstemp()
+        os.close(file_descriptor)
+
+    def tearDown(self) -> None:
+        os.remove(self.path)
+
+    def test_lazy_games(self) -> None:
+        """Tests that games are read back from another process' view of the file, one game at a time."""
+        data = pickle.loads(pickle.dumps(StaticServerData.write(self.path, self.games)))
+        self.assertEqual(set(data.games), {"Archipelago", "Game"})
+        self.assertEqual(data.get_game("Game"), self.games["Game"])
+        self.assertIs(data.get_game("Game"), data.get_game("Game"))
+        self.assertEqual(set(data._games), {"Game"})
+        self.assertEqual(data.get_game("Unknown Game"), StaticServerData.empty_game)
+        del data  # unmap the file, so it can be removed
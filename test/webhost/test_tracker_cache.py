@@ -0,0 +1,25 @@
+import unittest
+
+from WebHostLib.tracker import _ProcessCache
+
+
+class TestTrackerCache(unittest.TestCase):
+    def test_reuses_same_version(self) -> None:
+        cache = _ProcessCache(2)
+        self.assertEqual(cache.get("room", 1, lambda: "first"), "first")
+        self.assertEqual(cache.get("room", 1, lambda: "second"), "first")
+
+    def test_reloads_new_version(self) -> None:
+        cache = _ProcessCache(2)
+        cache.get("room", 1, lambda: "first")
+        self.assertEqual(cache.get("room", 2, lambda: "second"), "second")
+        self.assertEqual(cache.get("room", 2, lambda: "third"), "second")
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = _ProcessCache(2)
+        cache.get("a", None, lambda: "a")
+        cache.get("b", None, lambda: "b")
+        cache.get("a", None, lambda: "unused")
+        cache.get("c", None, lambda: "c")
+        self.assertEqual(cache.get("a", None, lambda: "reloaded"), "a")
+        self.assertEqual(cache.get("b", None, lambda: "reloaded"), "reloaded")
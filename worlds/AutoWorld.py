@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import hashlib
+import itertools
 import logging
 import pathlib
 import sys
 import time
+from concurrent.futures import Executor, Future, wait
 from random import Random
 from dataclasses import make_dataclass
 from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, TextIO, Tuple,
@@ -167,6 +169,8 @@ def _timed_call(method: Callable[..., Any], *args: Any,
     start = time.perf_counter()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if multiworld and multiworld.profile:
+        multiworld.profile.add_method(method, taken, player)
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -191,29 +195,71 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
         return ret
 
 
-def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
-    world_types: Set[AutoWorldRegister] = set()
-    for player in multiworld.player_ids:
+def _assert_unique_items(multiworld: "MultiWorld", player: int, new_items: List["Item"]) -> None:
+    for i, item in enumerate(new_items):
+        for other in new_items[i+1:]:
+            assert item is not other, (
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+
+def call_all(multiworld: "MultiWorld", method_name: str, *args: Any, executor: Optional[Executor] = None) -> None:
+    """
+    Calls method_name on the world of every player, then the matching stage method of every world type.
+
+    :param executor: if supplied, the methods of worlds with concurrent_stages run concurrently on it, before the
+        other worlds' methods run one at a time in player order. multiworld.random is unavailable while the concurrent
+        ones run and items added to the itempool are put into player order, so the result is the same as without it.
+    """
+    concurrent_players = [player for player in multiworld.player_ids if multiworld.worlds[player].concurrent_stages]
+    if executor and len(concurrent_players) > 1:
         prev_item_count = len(multiworld.itempool)
-        world_types.add(multiworld.worlds[player].__class__)
-        call_single(multiworld, method_name, player, *args)
+        _call_concurrently(multiworld, method_name, executor, concurrent_players, *args)
+        # concurrent worlds append to the itempool in whichever order they finish, but only items of their own player
+        new_items: Dict[int, List["Item"]] = {player: [] for player in multiworld.player_ids}
+        for item in multiworld.itempool[prev_item_count:]:
+            new_items[item.player].append(item)
+        for player in multiworld.player_ids:
+            if player not in concurrent_players:
+                prev_player_item_count = len(multiworld.itempool)
+                call_single(multiworld, method_name, player, *args)
+                new_items[player] += multiworld.itempool[prev_player_item_count:]
+        # restore the order of calling the worlds one at a time
+        multiworld.itempool[prev_item_count:] = itertools.chain.from_iterable(new_items.values())
         if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+            for player, player_items in new_items.items():
+                _assert_unique_items(multiworld, player, player_items)
+    else:
+        for player in multiworld.player_ids:
+            prev_item_count = len(multiworld.itempool)
+            call_single(multiworld, method_name, player, *args)
+            if __debug__:
+                _assert_unique_items(multiworld, player, multiworld.itempool[prev_item_count:])
 
     call_stage(multiworld, method_name, *args)
 
 
+def _call_concurrently(multiworld: "MultiWorld", method_name: str, executor: Executor, players: List[int],
+                       *args: Any) -> None:
+    futures: List[Future[Any]] = []
+    # worlds draw from their own random, seeded in player order, so only multiworld.random could depend on timing
+    multiworld.random.passthrough = False
+    try:
+        for player in players:
+            futures.append(executor.submit(call_single, multiworld, method_name, player, *args))
+        wait(futures)
+    finally:
+        multiworld.random.passthrough = True
+    for future in futures:
+        future.result()  # re-raise the first exception in player order
+
+
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types = {multiworld.worlds[player].__class__ for player in multiworld.player_ids}
     for world_type in sorted(world_types, key=lambda world: world.__name__):
         stage_callable = getattr(world_type, f"stage_{method_name}", None)
         if stage_callable:
-            _timed_call(stage_callable, multiworld, *args)
+            _timed_call(stage_callable, multiworld, *args, multiworld=multiworld)
 
 
 class WebWorld(metaclass=WebWorldRegister):
@@ -318,6 +364,11 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    concurrent_stages: ClassVar[bool] = False
+    """If True, generate_early through generate_basic of this world may run at the same time as those of other worlds,
+    when enabled by the host. They must then only use self.random and only modify this world's own state and the
+    parts of the MultiWorld belonging to its player."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -15,7 +15,7 @@ class TestProgressiveToolsLogic(SVTestBase):
     }
 
     def test_sturgeon(self):
-        self.multiworld.state.prog_items = {1: Counter()}
+        self.multiworld.state.prog_items[1] = Counter()
 
         sturgeon_rule = self.world.logic.has("Sturgeon")
         self.assert_rule_false(sturgeon_rule)
@@ -51,7 +51,7 @@ class TestProgressiveToolsLogic(SVTestBase):
         self.assert_rule_false(sturgeon_rule)
 
     def test_old_master_cannoli(self):
-        self.multiworld.state.prog_items = {1: Counter()}
+        self.multiworld.state.prog_items[1] = Counter()
 
         self.multiworld.state.collect(self.create_item("Progressive Axe"))
         self.multiworld.state.collect(self.create_item("Progressive Axe"))